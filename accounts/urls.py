@@ -9,4 +9,5 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('orders/', views.order_history, name='order_history'),
+    path('orders/export/', views.order_history_export, name='order_history_export'),
 ]
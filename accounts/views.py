@@ -6,6 +6,10 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .models import UserProfile
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from store.models import OrderItem
+from store.exports import export_response
+from store.pagination import paginate, page_querystring
 
 
 def register_view(request):
@@ -50,14 +54,29 @@ def logout_view(request):
     return redirect('store:home')
 
 
+def orders_with_items(user):
+    """The user's orders with their lines and products prefetched: one extra query per page, not per order."""
+    return user.orders.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product').only(
+            'order_id', 'product_id', 'quantity', 'price', 'product__name', 'product__slug',
+        ).order_by('id')),
+    )
+
+
 @login_required
 def profile_view(request):
     profile, _ = UserProfile.objects.get_or_create(user=request.user)
-    orders = request.user.orders.all()[:20]
+    orders = orders_with_items(request.user)[:20]
     return render(request, 'accounts/profile.html', {'profile': profile, 'orders': orders})
 
 
 @login_required
 def order_history(request):
-    orders = request.user.orders.all()
-    return render(request, 'accounts/order_history.html', {'orders': orders})
+    orders = paginate(request, orders_with_items(request.user), 20)
+    return render(request, 'accounts/order_history.html', {'orders': orders, 'page_query': page_querystring(request)})
+
+
+@login_required
+def order_history_export(request):
+    """All of the user's order lines as a streamed CSV (?format=jsonl for JSON lines)."""
+    return export_response('orders', request.GET.get('format'), 'orders', order__user=request.user)
@@ -24,12 +24,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.HTMLGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'store.middleware.CartMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -68,6 +71,21 @@ DATABASES = {
 #     import dj_database_url
 #     DATABASES['default'] = dj_database_url.config(conn_max_age=600)
 
+# Local memory cache for dev. Multi-worker deployments need a shared cache so the
+# catalog version and cached home rails are seen by every worker, e.g. REDIS_URL
+# (requires the redis package).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'precious-reflections',
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -84,9 +102,28 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed names (css/style.<hash>.css) plus .gz siblings;
+# with DEBUG=False run collectstatic before starting the server.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'store.staticfiles.GzipManifestStaticFilesStorage'},
+}
+# Serve STATIC_ROOT from Django (preferring .gz files) when no front-end server does it
+SERVE_STATIC = os.environ.get('SERVE_STATIC', 'False').lower() == 'true'
+
+# HTML responses smaller than this many bytes are sent uncompressed
+GZIP_MIN_LENGTH = 1024
+
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Responsive image variants (store.thumbnails): widths in px, written under MEDIA_ROOT/THUMBNAIL_DIR
+THUMBNAIL_WIDTHS = [160, 320, 640, 960]
+THUMBNAIL_DIR = 'thumbs'
+THUMBNAIL_QUALITY = 80
+# Seconds a worker process remembers that an image has no variants yet before checking storage again
+THUMBNAIL_MISS_TIMEOUT = 60
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'accounts:login'
@@ -95,3 +132,73 @@ LOGOUT_REDIRECT_URL = 'store:home'
 
 # Low stock threshold for admin dashboard
 LOW_STOCK_THRESHOLD = 5
+
+# Background task queue (store.queue, run with `manage.py run_workers`)
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_DELAY = 30  # seconds before the first retry, doubled on each further attempt
+TASK_LEASE_SECONDS = 300  # a worker's claim on a batch; tasks of a worker that died run again after this
+
+# Order emails. The console backend prints them; set EMAIL_BACKEND / EMAIL_HOST etc. for real delivery.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'Precious Reflections <orders@localhost>')
+
+# Stock counters per product when staff shard a flash-sale product's stock (store.inventory)
+STOCK_SHARDS = 8
+
+# Most rows a seller may upload in one listings CSV
+LISTING_UPLOAD_MAX_ROWS = 1000
+
+# Cart storage backend: session (a django_session write per cart edit) or signed cookie (no DB write)
+CART_STORAGE = os.environ.get('CART_STORAGE', 'store.cart_storage.SessionCartStorage')
+# CART_STORAGE = 'store.cart_storage.SignedCookieCartStorage'
+
+# Seconds a worker keeps its category snapshot (local saves/deletes invalidate it at once)
+CATEGORY_CACHE_TIMEOUT = 300
+
+# Seconds the home page featured rails stay cached (None = until a product changes)
+HOME_CACHE_TIMEOUT = None
+
+# Seconds shop facet counts stay cached per search text (product changes invalidate them too)
+FACET_CACHE_TIMEOUT = 600
+
+# Serve home, shop and product pages from the async views (store.async_views); for ASGI servers
+ASYNC_CATALOG_VIEWS = os.environ.get('ASYNC_CATALOG_VIEWS', 'False').lower() == 'true'
+
+# "You may also like" products per product page (store.related; refresh with refresh_related_products)
+RELATED_PRODUCTS_LIMIT = 4
+
+# Keyset (cursor) pagination on (created_at, id) for shop, my listings and order history.
+# Avoids COUNT(*) and OFFSET scans; pages are addressed by opaque ?cursor= tokens.
+CURSOR_PAGINATION = os.environ.get('CURSOR_PAGINATION', 'False').lower() == 'true'
+
+# Per-request query counting, N+1 detection and Server-Timing headers (store.profiling)
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False').lower() == 'true'
+# Requests slower than this (ms), or repeating one query N_PLUS_ONE_THRESHOLD+ times, go to PROFILING_LOG
+SLOW_REQUEST_MS = 500
+N_PLUS_ONE_THRESHOLD = 5
+PROFILING_LOG = BASE_DIR / 'slow_requests.log'
+# Who gets the Server-Timing header: 'staff', True (every client) or False
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'staff')
+if SERVER_TIMING_HEADER.lower() in ('true', 'false'):
+    SERVER_TIMING_HEADER = SERVER_TIMING_HEADER.lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PROFILING_LOG,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'store.profiling': {'handlers': ['slow_requests'], 'level': 'WARNING', 'propagate': False},
+    },
+}
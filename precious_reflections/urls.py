@@ -1,7 +1,10 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from store.staticfiles import serve as serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,3 +14,5 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+elif settings.SERVE_STATIC:
+    urlpatterns += [re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static)]
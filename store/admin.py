@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage, Order, OrderItem
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from . import inventory
+from .models import Category, Product, ProductImage, Order, OrderItem, SellerStats, Task
 
 
 class ProductImageInline(admin.TabularInline):
@@ -16,13 +19,26 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'seller', 'category', 'gender', 'price', 'stock', 'is_active', 'created_at']
-    list_filter = ['category', 'gender', 'is_active']
+    list_display = ['name', 'seller', 'category', 'gender', 'price', 'stock', 'stock_shards', 'is_active', 'created_at']
+    list_filter = ['category', 'gender', 'is_active', 'stock_shards']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     inlines = [ProductImageInline]
     list_editable = ['stock', 'is_active']
     raw_id_fields = ['seller']
+    actions = ['shard_stock', 'unshard_stock']
+
+    @admin.action(description='Shard stock (flash sale: spread checkouts over several stock rows)')
+    def shard_stock(self, request, queryset):
+        for product in queryset:
+            inventory.shard(product)
+        self.message_user(request, f'{queryset.count()} product(s) now keep their stock in {inventory.default_shards()} shards.')
+
+    @admin.action(description='Unshard stock (back to the single stock column)')
+    def unshard_stock(self, request, queryset):
+        for product in queryset.filter(stock_shards__gt=0):
+            inventory.shard(product, 0)
+        self.message_user(request, 'Stock merged back into the product rows.')
 
 
 class OrderItemInline(admin.TabularInline):
@@ -38,3 +54,34 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['email', 'first_name', 'last_name']
     inlines = [OrderItemInline]
     list_editable = ['status']
+
+
+@admin.register(SellerStats)
+class SellerStatsAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'units', 'revenue', 'order_count', 'updated_at']
+    search_fields = ['seller__username']
+    raw_id_fields = ['seller']
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'dedupe_key', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key', 'last_error']
+    readonly_fields = ['locked_by', 'locked_until', 'last_error', 'created_at', 'updated_at']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry now (failed or waiting tasks)')
+    def retry_now(self, request, queryset):
+        retried = 0
+        for task in queryset.exclude(status=Task.RUNNING):
+            try:
+                with transaction.atomic():
+                    Task.objects.filter(pk=task.pk).update(
+                        status=Task.PENDING, attempts=0, run_at=timezone.now(), locked_by='', locked_until=None,
+                    )
+            except IntegrityError:
+                # The same dedupe_key is already pending.
+                continue
+            retried += 1
+        self.message_user(request, f'{retried} task(s) queued to run now.')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class StoreConfig(AppConfig):
+    name = 'store'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+        from .search import restore_triggers
+        post_migrate.connect(restore_triggers, sender=self)
@@ -0,0 +1,68 @@
+"""Async versions of the catalog read views (home, shop, product_detail) for ASGI.
+
+Queries go through the async ORM, so under an ASGI server a request waiting on
+the database does not hold a worker thread. Template rendering still runs in a
+worker thread (``sync_to_async``): context processors and templates read the
+session, user and cart lazily. ``ASYNC_CATALOG_VIEWS = True`` routes the
+catalog URLs here (see store/urls.py).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from .catalog import aget_categories, aget_home_rails
+from .conditional import acondition, catalog_etag, product_etag, product_last_modified
+from .facets import agrouped_counts, grouped_counts
+from .inventory import alive_stock
+from .models import Product
+from .pagination import apaginate, paginate
+from .related import arelated_products
+from .views import shop_context, shop_listing
+
+arender = sync_to_async(render)
+
+
+@acondition(etag_func=catalog_etag)
+async def home(request):
+    """Home page; the category snapshot and the three gender rails load concurrently."""
+    categories, rails = await asyncio.gather(aget_categories(), aget_home_rails())
+    return await arender(request, 'store/home.html', {
+        'categories': categories[:6],
+        **rails,
+    })
+
+
+@acondition(etag_func=catalog_etag)
+async def shop(request, gender=None):
+    """Shop listing (same filters as ``views.shop``)."""
+    categories = await aget_categories()
+    if request.GET.get('q', '').strip():
+        # Full-text search reads its index with raw SQL, which has no async API: one worker-thread hop.
+        def search_page():
+            selected, hits, qs = shop_listing(request, gender, categories)
+            return selected, paginate(request, qs, 12), grouped_counts(hits, selected['q'])
+        selected, products, rows = await sync_to_async(search_page)()
+    else:
+        selected, hits, qs = shop_listing(request, gender, categories)
+        products, rows = await asyncio.gather(apaginate(request, qs, 12), agrouped_counts(hits))
+    return await arender(request, 'store/shop.html', shop_context(request, selected, categories, products, rows))
+
+
+@acondition(etag_func=product_etag, last_modified_func=product_last_modified)
+async def product_detail(request, slug):
+    """Product detail page."""
+    try:
+        product = await (
+            Product.objects.select_related('category', 'seller').prefetch_related('images')
+            .aget(slug=slug, is_active=True)
+        )
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+    await alive_stock([product])
+    related = await arelated_products(product)
+    return await arender(request, 'store/product_detail.html', {
+        'product': product,
+        'related': related,
+    })
@@ -0,0 +1,51 @@
+"""Small helpers shared by the ``bench_*`` and ``check_*`` management commands."""
+import statistics
+import time
+
+from django.test.utils import override_settings
+
+
+def isolated_cache():
+    """``override_settings`` giving the block a private local-memory cache.
+
+    For commands that roll their writes back: the dashboard counters, facet
+    counts and catalog version those writes touch must not reach the shared
+    cache (they are stored without a timeout).
+    """
+    return override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'isolated'},
+    })
+
+
+def time_calls(fn, repeat):
+    """Call ``fn`` ``repeat`` times and return the wall time of each call in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+def summarize(samples):
+    """Return mean/p50/p95/max of ``samples`` in milliseconds."""
+    return {
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'max_ms': max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def format_summary(label, samples):
+    s = summarize(samples)
+    return f"{label:<32} mean {s['mean_ms']:8.2f} ms   p50 {s['p50_ms']:8.2f} ms   p95 {s['p95_ms']:8.2f} ms"
@@ -1,11 +1,90 @@
-"""Cart helpers using session."""
+"""Cart helpers. Lines are persisted by the configured cart storage backend (see cart_storage)."""
 from decimal import Decimal
+from .cart_storage import get_cart_storage
+from .inventory import live_stock
 from .models import Product
 
 
+class Cart:
+    """The cart for one request.
+
+    Products are fetched once, on first access to ``items``, and reused for
+    ``total`` and ``count`` for the rest of the request. Mutating helpers below
+    call ``invalidate()`` so a later read sees the new contents.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._items = None
+
+    @property
+    def data(self):
+        """Stored lines: {product_id: {'quantity': int, 'price': str}}."""
+        return get_cart_storage(self.request).load()
+
+    @property
+    def items(self):
+        """List of {'product', 'quantity', 'price', 'subtotal'}, quantities clamped to stock."""
+        if self._items is None:
+            self._items = self._load_items()
+        return self._items
+
+    @property
+    def total(self):
+        return sum(item['subtotal'] for item in self.items)
+
+    @property
+    def count(self):
+        """Number of units. Read from the stored lines unless products are already loaded."""
+        if self._items is None:
+            return sum(line.get('quantity', 0) for line in self.data.values())
+        return sum(item['quantity'] for item in self._items)
+
+    def invalidate(self):
+        self._items = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _load_items(self):
+        cart = self.data
+        if not cart:
+            return []
+        products = {str(p.id): p for p in live_stock(list(Product.objects.filter(id__in=list(cart.keys()), is_active=True)))}
+        result = []
+        for pid, data in cart.items():
+            if pid not in products:
+                continue
+            product = products[pid]
+            qty = data.get('quantity', 0)
+            if qty > product.stock:
+                qty = product.stock
+            if qty <= 0:
+                continue
+            price = Decimal(data.get('price', product.price))
+            result.append({'product': product, 'quantity': qty, 'price': price, 'subtotal': qty * price})
+        return result
+
+
+def get_request_cart(request):
+    """Return the request's Cart (attached lazily by CartMiddleware, or created here)."""
+    cart = getattr(request, 'cart', None)
+    if cart is None:
+        cart = request.cart = Cart(request)
+    return cart
+
+
 def get_cart(request):
-    """Return cart dict from session. Format: {product_id: {'quantity': int, 'price': str}}."""
-    return request.session.get('cart', {})
+    """Return stored cart dict. Format: {product_id: {'quantity': int, 'price': str}}."""
+    return get_cart_storage(request).load()
+
+
+def _save(request, cart):
+    get_cart_storage(request).save(cart)
+    get_request_cart(request).invalidate()
 
 
 def cart_add(request, product_id, quantity=1):
@@ -15,6 +94,7 @@ def cart_add(request, product_id, quantity=1):
         product = Product.objects.get(pk=product_id, is_active=True)
     except Product.DoesNotExist:
         return False
+    live_stock([product])
     q = cart.get(str(product_id), {}).get('quantity', 0) + quantity
     if q > product.stock:
         q = product.stock
@@ -22,8 +102,7 @@ def cart_add(request, product_id, quantity=1):
         cart.pop(str(product_id), None)
     else:
         cart[str(product_id)] = {'quantity': q, 'price': str(product.price)}
-    request.session['cart'] = cart
-    request.session.modified = True
+    _save(request, cart)
     return True
 
 
@@ -31,8 +110,7 @@ def cart_remove(request, product_id):
     """Remove item from cart."""
     cart = get_cart(request).copy()
     cart.pop(str(product_id), None)
-    request.session['cart'] = cart
-    request.session.modified = True
+    _save(request, cart)
 
 
 def cart_update(request, product_id, quantity):
@@ -45,35 +123,19 @@ def cart_update(request, product_id, quantity):
 
 def cart_clear(request):
     """Clear entire cart."""
-    request.session['cart'] = {}
-    request.session.modified = True
+    _save(request, {})
 
 
 def cart_items(request):
     """Return list of (product, quantity, line_total) for template."""
-    cart = get_cart(request)
-    if not cart:
-        return []
-    product_ids = list(cart.keys())
-    products = {str(p.id): p for p in Product.objects.filter(id__in=product_ids, is_active=True)}
-    result = []
-    for pid, data in cart.items():
-        if pid not in products:
-            continue
-        product = products[pid]
-        qty = data.get('quantity', 0)
-        if qty > product.stock:
-            qty = product.stock
-        price = Decimal(data.get('price', product.price))
-        result.append({'product': product, 'quantity': qty, 'price': price, 'subtotal': qty * price})
-    return result
+    return get_request_cart(request).items
 
 
 def cart_total(request):
     """Return total amount for cart."""
-    return sum(item['subtotal'] for item in cart_items(request))
+    return get_request_cart(request).total
 
 
 def cart_count(request):
     """Return total number of items in cart."""
-    return sum(item['quantity'] for item in cart_items(request))
+    return get_request_cart(request).count
@@ -0,0 +1,91 @@
+"""Where the cart lines live between requests.
+
+``CART_STORAGE`` names the backend class. Cart lines are a dict
+``{product_id: {'quantity': int, 'price': str}}`` whatever the backend.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseCartStorage:
+    """Interface: ``load()`` the lines, ``save()`` new lines, then ``update_response()``."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, data):
+        raise NotImplementedError
+
+    def update_response(self, response):
+        """Persist pending changes on the outgoing response, if the backend needs to."""
+
+
+class SessionCartStorage(BaseCartStorage):
+    """Lines in ``request.session['cart']``: each edit is a session (database) write."""
+
+    def load(self):
+        return self.request.session.get('cart', {})
+
+    def save(self, data):
+        self.request.session['cart'] = data
+        self.request.session.modified = True
+
+
+class SignedCookieCartStorage(BaseCartStorage):
+    """Lines in a compact signed cookie: ``id:qty:price|id:qty:price``. Edits never touch the database."""
+    salt = 'store.cart'
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cookie_name = getattr(settings, 'CART_COOKIE_NAME', 'cart')
+        self.max_age = getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 14)
+        self._data = None
+        self._dirty = False
+
+    def load(self):
+        if self._data is None:
+            raw = self.request.get_signed_cookie(self.cookie_name, default='', salt=self.salt, max_age=self.max_age)
+            self._data = self.decode(raw)
+        return self._data
+
+    def save(self, data):
+        self._data = data
+        self._dirty = True
+
+    def update_response(self, response):
+        if not self._dirty:
+            return
+        if self._data:
+            response.set_signed_cookie(
+                self.cookie_name, self.encode(self._data), salt=self.salt, max_age=self.max_age,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        else:
+            response.delete_cookie(self.cookie_name, samesite='Lax')
+
+    @staticmethod
+    def encode(data):
+        return '|'.join(f"{pid}:{line['quantity']}:{line['price']}" for pid, line in data.items())
+
+    @staticmethod
+    def decode(raw):
+        data = {}
+        for part in raw.split('|') if raw else []:
+            try:
+                pid, qty, price = part.split(':')
+                data[str(int(pid))] = {'quantity': int(qty), 'price': price}
+            except ValueError:
+                continue
+        return data
+
+
+def get_cart_storage(request):
+    """The request's cart storage backend, created once per request."""
+    storage = getattr(request, '_cart_storage', None)
+    if storage is None:
+        backend = import_string(getattr(settings, 'CART_STORAGE', 'store.cart_storage.SessionCartStorage'))
+        storage = request._cart_storage = backend(request)
+    return storage
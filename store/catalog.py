@@ -0,0 +1,129 @@
+"""Process-local catalog snapshots shared by views and context processors."""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'store:catalog_version'
+# What a home rail card renders; the shared cache holds only these values.
+RAIL_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'seller__username')
+RAILS = (('featured_men', 'M', 8), ('featured_women', 'F', 8), ('featured_unisex', 'U', 4))
+
+_lock = threading.Lock()
+_categories = None
+_categories_loaded_at = 0.0
+
+
+def get_categories():
+    """All categories (ordered by name), loaded once per worker process.
+
+    The snapshot is dropped by ``invalidate_categories`` when a Category is saved
+    or deleted in this process. Other worker processes pick the change up when
+    their copy is older than ``CATEGORY_CACHE_TIMEOUT`` seconds.
+    """
+    global _categories, _categories_loaded_at
+    timeout = getattr(settings, 'CATEGORY_CACHE_TIMEOUT', 300)
+    snapshot = _categories
+    if snapshot is not None and (timeout is None or time.monotonic() - _categories_loaded_at < timeout):
+        return snapshot
+    from .models import Category
+    with _lock:
+        snapshot = list(Category.objects.all())
+        _categories = snapshot
+        _categories_loaded_at = time.monotonic()
+    return snapshot
+
+
+async def aget_categories():
+    """Async ``get_categories``: reuses the worker's snapshot, reloading it with the async ORM."""
+    global _categories, _categories_loaded_at
+    timeout = getattr(settings, 'CATEGORY_CACHE_TIMEOUT', 300)
+    snapshot = _categories
+    if snapshot is not None and (timeout is None or time.monotonic() - _categories_loaded_at < timeout):
+        return snapshot
+    from .models import Category
+    snapshot = [category async for category in Category.objects.all()]
+    _categories = snapshot
+    _categories_loaded_at = time.monotonic()
+    return snapshot
+
+
+def invalidate_categories(**kwargs):
+    """Drop the category snapshot; usable directly as a signal receiver."""
+    global _categories
+    _categories = None
+
+
+def catalog_version():
+    """Current catalog version stamp, kept in the shared cache.
+
+    Cached catalog fragments embed it in their keys, so bumping it invalidates
+    all of them in every worker at once.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a cache flush never reuses an old version.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+async def acatalog_version():
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version(**kwargs):
+    """Invalidate every cached catalog fragment; usable directly as a signal receiver."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def _rail_rows(gender):
+    from .models import Product
+    return Product.objects.filter(is_active=True, gender=gender).values_list(*RAIL_FIELDS)
+
+
+def _rail_products(rows):
+    """Unsaved Products (and sellers) carrying just the cached card fields, for the template."""
+    from django.contrib.auth import get_user_model
+    from .models import Product
+    User = get_user_model()
+    products = []
+    for pk, slug, name, price, image, seller in rows:
+        product = Product(id=pk, slug=slug, name=name, price=price, image=image)
+        if seller is not None:
+            product.seller = User(username=seller)
+        products.append(product)
+    return products
+
+
+def get_home_rails():
+    """Featured products for the home page: {'featured_men', 'featured_women', 'featured_unisex'}."""
+    key = f'store:home_rails:{catalog_version()}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = {name: list(_rail_rows(gender)[:size]) for name, gender, size in RAILS}
+        cache.set(key, rows, getattr(settings, 'HOME_CACHE_TIMEOUT', None))
+    return {name: _rail_products(rail) for name, rail in rows.items()}
+
+
+async def aget_home_rails():
+    """Async ``get_home_rails``; on a cache miss the three rails are queried concurrently."""
+    key = f'store:home_rails:{await acatalog_version()}'
+    rows = await cache.aget(key)
+    if rows is None:
+        async def rail(gender, size):
+            return [row async for row in _rail_rows(gender)[:size]]
+
+        fetched = await asyncio.gather(*(rail(gender, size) for _name, gender, size in RAILS))
+        rows = {name: rail for (name, _gender, _size), rail in zip(RAILS, fetched)}
+        await cache.aset(key, rows, getattr(settings, 'HOME_CACHE_TIMEOUT', None))
+    return {name: _rail_products(rail) for name, rail in rows.items()}
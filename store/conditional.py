@@ -0,0 +1,119 @@
+"""Validators for conditional GET (``ETag`` / ``Last-Modified``) on catalog pages.
+
+Used with ``django.views.decorators.http.condition``: a request whose
+``If-None-Match`` / ``If-Modified-Since`` still matches gets ``304 Not
+Modified`` before the view runs. Pages also show per-visitor bits (navbar user,
+cart count, CSRF token), so every ETag mixes those in; a page with pending
+flash messages is never answered with 304.
+
+A take from sharded stock (store.inventory) leaves the product row alone, so a
+sharded product's ETag includes its live shard total, and its page sends no
+``Last-Modified``: no timestamp moves when its stock does.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from .cart import get_request_cart
+from .catalog import catalog_version
+from .inventory import shard_total
+from .models import Product
+from .related import related_versions
+
+
+def _visitor(request):
+    if getattr(request, '_messages', None) is not None and len(request._messages):
+        return None
+    return [
+        request.user.pk if request.user.is_authenticated else 0,
+        get_request_cart(request).count,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def catalog_etag(request, *args, **kwargs):
+    """ETag for listing pages (home, shop): the catalog version stamp plus the visitor."""
+    visitor = _visitor(request)
+    if visitor is None:
+        return None
+    return _etag('catalog', catalog_version(), visitor)
+
+
+def _product_validators(request, slug):
+    """(etag parts, last modified) for a product page, computed once per request."""
+    cached = getattr(request, '_product_validators', None)
+    if cached is None:
+        product = (
+            Product.objects.filter(slug=slug, is_active=True)
+            .values('id', 'category_id', 'updated_at', 'stock_shards').first()
+        )
+        if product is None:
+            cached = (None, None)
+        else:
+            related = related_versions(product['id'], product['category_id'])
+            parts = (product['id'], product['updated_at'], related)
+            if product['stock_shards']:
+                cached = (parts + (shard_total(product['id']),), None)
+            else:
+                last_modified = max([product['updated_at']] + [updated_at for _id, updated_at in related])
+                cached = (parts, last_modified)
+        request._product_validators = cached
+    return cached
+
+
+def product_etag(request, slug):
+    """ETag for product_detail: the product's and its related products' ``updated_at`` (and live
+    sharded stock) plus the visitor."""
+    parts, _last_modified = _product_validators(request, slug)
+    visitor = _visitor(request)
+    if parts is None or visitor is None:
+        return None
+    return _etag('product', parts, visitor)
+
+
+def product_last_modified(request, slug):
+    """Latest ``updated_at`` of the product and the related products shown with it (None if sharded)."""
+    if _visitor(request) is None:
+        return None
+    return _product_validators(request, slug)[1]
+
+
+class _Probe(HttpResponse):
+    """Stand-in response that tells ``acondition`` the real view has to run."""
+
+
+def _probe(request, *args, **kwargs):
+    return _Probe()
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """``condition`` for async views.
+
+    The validators read the session, cart and database, so Django's own
+    ``condition`` runs them in one worker-thread hop around a stand-in view;
+    a 304/412 is returned as is, otherwise the async view runs and gets the
+    computed ``ETag`` / ``Last-Modified`` headers.
+    """
+    check = sync_to_async(condition(etag_func=etag_func, last_modified_func=last_modified_func)(_probe))
+
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            probe = await check(request, *args, **kwargs)
+            if not isinstance(probe, _Probe):
+                return probe
+            response = await view(request, *args, **kwargs)
+            for header in ('ETag', 'Last-Modified'):
+                if probe.has_header(header):
+                    response.headers.setdefault(header, probe[header])
+            return response
+        return inner
+    return decorator
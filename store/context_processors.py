@@ -1,14 +1,11 @@
 def cart_count(request):
-    """Add cart item count to template context."""
-    count = 0
-    if request.session.get('cart'):
-        for item in request.session['cart'].values():
-            count += item.get('quantity', 0)
-    return {'cart_count': count}
+    """Add the request's cart and its item count to template context."""
+    from .cart import get_request_cart
+    cart = get_request_cart(request)
+    return {'cart': cart, 'cart_count': cart.count}
 
 
 def categories_nav(request):
-    """Add categories for navigation."""
-    from .models import Category
-    categories = Category.objects.all()[:10]
-    return {'nav_categories': categories}
+    """Add categories for navigation (from the cached category snapshot)."""
+    from .catalog import get_categories
+    return {'nav_categories': get_categories()[:10]}
@@ -0,0 +1,94 @@
+"""Admin dashboard counters.
+
+Each counter lives in the shared cache. A missing counter group is recomputed
+with one conditional-aggregate query on its table; after that, signals on Order,
+Product and User keep the counters current with ``cache.incr``. Checkout and
+stock rebalancing update stock with querysets, which send no signals, and call
+``stock_moved()`` per product instead. Bulk writes of many rows (imports) call
+``invalidate()`` so the group is recomputed on the next read.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+PREFIX = 'store:dashboard:'
+
+GROUPS = {
+    'orders': ['total_orders', 'pending_orders'],
+    'users': ['total_users'],
+    'products': ['low_stock_products', 'out_of_stock'],
+}
+
+
+def low_stock_threshold():
+    return getattr(settings, 'LOW_STOCK_THRESHOLD', 5)
+
+
+def stock_counters(stock):
+    """Counter names a product with this stock level counts towards."""
+    if stock == 0:
+        return ['out_of_stock']
+    if stock <= low_stock_threshold():
+        return ['low_stock_products']
+    return []
+
+
+def _compute(group):
+    from .models import Order, Product
+    if group == 'orders':
+        return Order.objects.aggregate(
+            total_orders=Count('id'),
+            pending_orders=Count('id', filter=Q(status='P')),
+        )
+    if group == 'users':
+        return get_user_model().objects.aggregate(total_users=Count('id', filter=Q(is_staff=False)))
+    return Product.objects.aggregate(
+        low_stock_products=Count('id', filter=Q(stock__gt=0, stock__lte=low_stock_threshold())),
+        out_of_stock=Count('id', filter=Q(stock=0)),
+    )
+
+
+def get_stats(refresh=False):
+    """All dashboard counters; groups missing from the cache (or all, with refresh) are recomputed."""
+    keys = [PREFIX + name for names in GROUPS.values() for name in names]
+    if refresh:
+        cache.delete_many(keys)
+    values = cache.get_many(keys)
+    for group, names in GROUPS.items():
+        if all(PREFIX + name in values for name in names):
+            continue
+        computed = {PREFIX + name: value for name, value in _compute(group).items()}
+        cache.set_many(computed, timeout=None)
+        values.update(computed)
+    return {key[len(PREFIX):]: value for key, value in values.items()}
+
+
+def adjust(name, delta):
+    """Add ``delta`` to a counter once the current transaction commits.
+
+    A counter that is not cached is left for the next read to compute.
+    """
+    if not delta:
+        return
+
+    def incr():
+        try:
+            cache.incr(PREFIX + name, delta)
+        except ValueError:
+            pass
+    transaction.on_commit(incr)
+
+
+def stock_moved(before, after):
+    """Move one product between the stock counters when its stock goes from ``before`` to ``after``."""
+    for name in stock_counters(before):
+        adjust(name, -1)
+    for name in stock_counters(after):
+        adjust(name, 1)
+
+
+def invalidate(group):
+    """Drop a counter group once the current transaction commits; the next read recomputes it."""
+    transaction.on_commit(lambda: cache.delete_many([PREFIX + name for name in GROUPS[group]]))
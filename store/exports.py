@@ -0,0 +1,129 @@
+"""Streaming CSV / JSON-lines exports of order lines (buyer history, seller sales, all orders).
+
+Rows come from ``.iterator(chunk_size=...)`` over a ``select_related`` query and
+are written to the response as they are read, in ~64 KB chunks, so memory stays
+flat however many rows there are. Each export is ordered along an index
+(``order_id``, or ``(seller, order)`` for sellers), so the database does not
+sort the whole result first.
+"""
+import csv
+import io
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import OrderItem
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+# Spreadsheet apps run cells starting with these as formulas (CSV injection).
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+ORDER_COLUMNS = [
+    ('order_id', lambda i: i.order_id),
+    ('created_at', lambda i: i.order.created_at),
+    ('status', lambda i: i.order.get_status_display()),
+    ('product', lambda i: i.product.name),
+    ('product_slug', lambda i: i.product.slug),
+    ('quantity', lambda i: i.quantity),
+    ('price', lambda i: i.price),
+    ('subtotal', lambda i: i.quantity * i.price),
+]
+SHIPPING_COLUMNS = [
+    ('email', lambda i: i.order.email),
+    ('name', lambda i: f'{i.order.first_name} {i.order.last_name}'),
+    ('city', lambda i: i.order.city),
+    ('country', lambda i: i.order.country),
+]
+
+EXPORTS = {
+    # Buyer: their own orders, one row per line.
+    'orders': {
+        'columns': ORDER_COLUMNS + [('order_total', lambda i: i.order.total)],
+        'related': ['order', 'product'],
+        'fields': ['order__created_at', 'order__status', 'order__total', 'product__name', 'product__slug'],
+        'ordering': ['-order_id', 'id'],
+    },
+    # Seller: lines they sold, with where they were shipped.
+    'sales': {
+        'columns': ORDER_COLUMNS + SHIPPING_COLUMNS,
+        'related': ['order', 'product'],
+        'fields': [
+            'order__created_at', 'order__status', 'order__email', 'order__first_name', 'order__last_name',
+            'order__city', 'order__country', 'product__name', 'product__slug',
+        ],
+        'ordering': ['seller_id', 'order_id', 'id'],
+    },
+    # Staff: every order line.
+    'all-orders': {
+        'columns': ORDER_COLUMNS + SHIPPING_COLUMNS + [
+            ('order_total', lambda i: i.order.total),
+            ('seller', lambda i: i.seller.username if i.seller_id else ''),
+        ],
+        'related': ['order', 'product', 'seller'],
+        'fields': [
+            'order__created_at', 'order__status', 'order__total', 'order__email', 'order__first_name',
+            'order__last_name', 'order__city', 'order__country', 'product__name', 'product__slug', 'seller__username',
+        ],
+        'ordering': ['order_id', 'id'],
+    },
+}
+
+
+def export_queryset(kind, **filters):
+    spec = EXPORTS[kind]
+    return (
+        OrderItem.objects.filter(**filters).select_related(*spec['related'])
+        .only('order_id', 'product_id', 'seller_id', 'quantity', 'price', *spec['fields'])
+        .order_by(*spec['ordering'])
+    )
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(columns, items):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _get in columns])
+    for item in items:
+        writer.writerow([_csv_cell(get(item)) for _name, get in columns])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(columns, items):
+    encoder = DjangoJSONEncoder()
+    lines, size = [], 0
+    for item in items:
+        line = encoder.encode({name: get(item) for name, get in columns})
+        lines.append(line)
+        size += len(line) + 1
+        if size >= FLUSH_BYTES:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_response(kind, fmt, filename, **filters):
+    """StreamingHttpResponse with the ``kind`` export in ``fmt`` ('csv' or 'jsonl')."""
+    fmt = fmt if fmt in FORMATS else 'csv'
+    columns = EXPORTS[kind]['columns']
+    items = export_queryset(kind, **filters).iterator(chunk_size=CHUNK_SIZE)
+    chunks = csv_chunks(columns, items) if fmt == 'csv' else jsonl_chunks(columns, items)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{date.today():%Y-%m-%d}.{fmt}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
@@ -0,0 +1,101 @@
+"""Shop sidebar facet counts (category, gender, price band).
+
+One grouped ``COUNT`` over (category, gender, price band) for the current search
+gives every facet: each facet's counts are summed in Python from the rows that
+match the *other* selected filters. The grouped rows are cached per normalized
+search text and catalog version.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+
+from .catalog import acatalog_version, catalog_version, get_categories
+from .models import GENDER_CHOICES
+from .search import SearchResults
+
+# (key, label, min price inclusive, max price exclusive)
+PRICE_BANDS = [
+    ('0-50', 'Under $50', None, 50),
+    ('50-100', '$50 – $100', 50, 100),
+    ('100-200', '$100 – $200', 100, 200),
+    ('200-', '$200 and up', 200, None),
+]
+PRICE_BAND_KEYS = {band[0] for band in PRICE_BANDS}
+
+
+def filter_price_band(qs, band):
+    """Restrict a Product queryset to one of PRICE_BANDS (by key); unknown keys are ignored."""
+    for key, _label, low, high in PRICE_BANDS:
+        if key == band:
+            if low is not None:
+                qs = qs.filter(price__gte=low)
+            if high is not None:
+                qs = qs.filter(price__lt=high)
+    return qs
+
+
+def _band_expression():
+    whens = []
+    for key, _label, _low, high in PRICE_BANDS:
+        if high is not None:
+            whens.append(When(price__lt=high, then=Value(key)))
+    return Case(*whens, default=Value(PRICE_BANDS[-1][0]), output_field=CharField())
+
+
+def normalize_query(q):
+    return ' '.join(q.lower().split())
+
+
+def _cache_key(version, q):
+    return f'store:facets:{version}:{hashlib.md5(normalize_query(q).encode()).hexdigest()}'
+
+
+def grouped_counts(base_qs, q=''):
+    """[(category_id, gender, band, count)] for ``base_qs``, cached per (search text, catalog version)."""
+    if isinstance(base_qs, SearchResults):
+        base_qs = base_qs.as_queryset()
+    key = _cache_key(catalog_version(), q)
+    rows = cache.get(key)
+    if rows is None:
+        rows = [
+            (r['category_id'], r['gender'], r['band'], r['n'])
+            for r in base_qs.annotate(band=_band_expression())
+            .values('category_id', 'gender', 'band').annotate(n=Count('id')).order_by()
+        ]
+        cache.set(key, rows, getattr(settings, 'FACET_CACHE_TIMEOUT', 600))
+    return rows
+
+
+async def agrouped_counts(base_qs, q=''):
+    """Async ``grouped_counts`` for a queryset (ranked search results go through the sync version)."""
+    key = _cache_key(await acatalog_version(), q)
+    rows = await cache.aget(key)
+    if rows is None:
+        grouped = (
+            base_qs.annotate(band=_band_expression())
+            .values('category_id', 'gender', 'band').annotate(n=Count('id')).order_by()
+        )
+        rows = [(r['category_id'], r['gender'], r['band'], r['n']) async for r in grouped.aiterator()]
+        await cache.aset(key, rows, getattr(settings, 'FACET_CACHE_TIMEOUT', 600))
+    return rows
+
+
+def facet_counts(rows, category_id=None, gender=None, band=None):
+    """Per-facet counts, each computed under the other two selections."""
+    by_category, by_gender, by_band = {}, {}, {}
+    for cat, gen, bnd, n in rows:
+        if (gender is None or gen == gender) and (band is None or bnd == band):
+            by_category[cat] = by_category.get(cat, 0) + n
+        if (category_id is None or cat == category_id) and (band is None or bnd == band):
+            by_gender[gen] = by_gender.get(gen, 0) + n
+        if (category_id is None or cat == category_id) and (gender is None or gen == gender):
+            by_band[bnd] = by_band.get(bnd, 0) + n
+    return {
+        'categories': [
+            {'slug': c.slug, 'name': c.name, 'count': by_category.get(c.id, 0)} for c in get_categories()
+        ],
+        'genders': [{'value': value, 'label': label, 'count': by_gender.get(value, 0)} for value, label in GENDER_CHOICES],
+        'price_bands': [{'value': key, 'label': label, 'count': by_band.get(key, 0)} for key, label, _l, _h in PRICE_BANDS],
+    }
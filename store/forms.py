@@ -1,5 +1,13 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
 from django import forms
-from .models import Order, Product
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.text import slugify
+from .catalog import get_categories
+from .models import GENDER_CHOICES, Order, Product
 
 
 class CheckoutForm(forms.ModelForm):
@@ -35,3 +43,82 @@ class ProductForm(forms.ModelForm):
             'gender': forms.Select(attrs={'class': 'form-select'}),
             'image': forms.FileInput(attrs={'class': 'form-control'}),
         }
+
+
+class ListingUploadForm(forms.Form):
+    """CSV of listings: name, price, category (name or slug) required; description, stock, gender optional.
+
+    The whole file is validated first; ``cleaned_data['products']`` holds unsaved
+    Products (no seller, no slug) only if every row is valid.
+    """
+    file = forms.FileField(widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}))
+
+    max_errors = 20
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        max_rows = getattr(settings, 'LISTING_UPLOAD_MAX_ROWS', 1000)
+        categories = {}
+        for category in get_categories():
+            categories[category.slug] = category
+            categories.setdefault(category.name.lower(), category)
+        genders = {value: value for value, _label in GENDER_CHOICES}
+        genders.update((label.lower(), value) for value, label in GENDER_CHOICES)
+
+        try:
+            reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+            rows = list(reader)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise forms.ValidationError(f'Could not read the file as UTF-8 CSV ({exc}).')
+        if not rows:
+            raise forms.ValidationError('The file has no rows.')
+        if len(rows) > max_rows:
+            raise forms.ValidationError(f'At most {max_rows} listings per upload ({len(rows)} rows).')
+
+        products, errors = [], []
+        for line, row in enumerate(rows, 2):
+            row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            try:
+                products.append(self._product(row, categories, genders))
+            except ValueError as exc:
+                errors.append(f'Line {line}: {exc}')
+        if errors:
+            more = len(errors) - self.max_errors
+            raise forms.ValidationError(errors[:self.max_errors] + ([f'... and {more} more.'] if more > 0 else []))
+        self.cleaned_data['products'] = products
+        return upload
+
+    @staticmethod
+    def _product(row, categories, genders):
+        if not row.get('name'):
+            raise ValueError('name is required')
+        try:
+            price = Decimal(row.get('price', '')).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError(f'bad price {row.get("price")!r}')
+        if not price.is_finite():
+            # NaN survives quantize() and makes the validators' comparisons raise InvalidOperation.
+            raise ValueError(f'bad price {row.get("price")!r}')
+        try:
+            # The field's own validators: not negative, at most max_digits digits.
+            Product._meta.get_field('price').run_validators(price)
+        except ValidationError as exc:
+            raise ValueError(f'bad price {row.get("price")!r}: {" ".join(exc.messages)}')
+        try:
+            stock = int(row.get('stock') or 0)
+        except ValueError:
+            raise ValueError(f'bad stock {row["stock"]!r}')
+        if stock < 0:
+            raise ValueError('stock cannot be negative')
+        value = row.get('category', '')
+        category = categories.get(value) or categories.get(value.lower()) or categories.get(slugify(value))
+        if category is None:
+            raise ValueError(f'unknown category {value!r}')
+        gender = row.get('gender') or 'U'
+        gender = genders.get(gender.upper()) or genders.get(gender.lower())
+        if gender is None:
+            raise ValueError(f'bad gender {row["gender"]!r} (use M, F or U)')
+        return Product(
+            name=row['name'][:200], description=row.get('description', ''), price=price, stock=stock,
+            category=category, gender=gender,
+        )
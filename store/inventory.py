@@ -0,0 +1,168 @@
+"""Sharded stock for flash-sale products.
+
+Every checkout of an ordinary product updates its one ``Product.stock`` row, so
+concurrent orders for a hot SKU queue on that row lock. A product with
+``stock_shards = N`` keeps its stock in N StockShard rows instead: a checkout
+takes its units from one random shard with a conditional update, so up to N
+orders for it can commit side by side. When the chosen shard is short, the
+checkout locks all the product's shards, takes the units from the total and
+spreads the rest evenly again.
+
+``Product.stock`` stays the total *as of the last rebalance* (listings,
+filters and the dashboard read it), except that a checkout emptying the shards
+writes 0 at once so listings show the product as sold out. ``rebalance()``
+evens the shards out and writes the total back; checkout queues it for the product a few seconds later
+(store.tasks), and the ``rebalance_stock`` command runs it for every sharded
+product. ``live_stock()``
+overlays the exact total on products the cart and product page load, so
+``stock``, ``is_low_stock`` and ``out_of_stock`` read the current value there;
+the product page's ETag includes that total too (store.conditional).
+Saving a sharded product with a new ``stock`` (admin, edit listing) sets the
+shards' total to it.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Product, StockShard
+from . import dashboard
+
+
+def default_shards():
+    return getattr(settings, 'STOCK_SHARDS', 8)
+
+
+def _split(total, n):
+    """``total`` units over ``n`` shards, as evenly as possible."""
+    base, extra = divmod(total, n)
+    return [base + (i < extra) for i in range(n)]
+
+
+def _locked_shards(product_id):
+    # Always lock in shard order so concurrent callers cannot deadlock.
+    return list(StockShard.objects.select_for_update().filter(product_id=product_id).order_by('number'))
+
+
+def _spread(rows, total):
+    changed = []
+    for row, count in zip(rows, _split(total, len(rows))):
+        if row.count != count:
+            row.count = count
+            changed.append(row)
+    StockShard.objects.bulk_update(changed, ['count'])
+
+
+def shard(product, shards=None):
+    """Split ``product``'s stock across ``shards`` counters (default ``STOCK_SHARDS``); 0 merges it back."""
+    shards = default_shards() if shards is None else shards
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        rows = _locked_shards(product.pk)
+        total = sum(row.count for row in rows) if product.stock_shards else product.stock
+        StockShard.objects.filter(product=product).delete()
+        StockShard.objects.bulk_create([
+            StockShard(product=product, number=number, count=count)
+            for number, count in enumerate(_split(total, shards) if shards else [])
+        ])
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=shards, updated_at=timezone.now())
+        dashboard.invalidate('products')
+        transaction.on_commit(bump_catalog_version)
+    return total
+
+
+def set_total(product, total):
+    """Make a sharded product's shards add up to ``total``."""
+    with transaction.atomic():
+        _spread(_locked_shards(product.pk), total)
+
+
+def take(product, quantity):
+    """Take ``quantity`` units of a sharded product in the caller's transaction.
+
+    Returns False if there are not enough units or the product is no longer
+    active; the caller must then roll back. The product row is only read, so
+    checkouts of the product do not queue on it.
+    """
+    number = random.randrange(product.stock_shards)
+    # Write first: on SQLite a transaction that reads before writing can fail to upgrade its lock.
+    taken = StockShard.objects.filter(product_id=product.pk, number=number, count__gte=quantity).update(
+        count=F('count') - quantity,
+    )
+    if not taken:
+        # That shard is short: take the units from the total and even the shards out.
+        rows = _locked_shards(product.pk)
+        total = sum(row.count for row in rows)
+        if total < quantity:
+            return False
+        _spread(rows, total - quantity)
+    return Product.objects.filter(pk=product.pk, is_active=True).exists()
+
+
+def rebalance(product_ids=None):
+    """Even out the shards of sharded products and write their totals to ``Product.stock``.
+
+    Returns how many products' ``stock`` changed. Each product is locked and
+    updated in its own short transaction. Listings only show whether a product
+    is in stock, so the catalog version is bumped only when a total goes to or
+    from 0.
+    """
+    products = Product.objects.filter(stock_shards__gt=0)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    changed = 0
+    availability_changed = False
+    for product_id, stock in products.values_list('id', 'stock'):
+        with transaction.atomic():
+            rows = _locked_shards(product_id)
+            total = sum(row.count for row in rows)
+            _spread(rows, total)
+            if total != stock:
+                Product.objects.filter(pk=product_id).update(stock=total, updated_at=timezone.now())
+                # Queryset updates send no signals.
+                dashboard.stock_moved(stock, total)
+                changed += 1
+                availability_changed |= (total == 0) != (stock == 0)
+    if availability_changed:
+        bump_catalog_version()
+    return changed
+
+
+def _totals(product_ids):
+    return (
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values('product_id').annotate(total=Sum('count')).values_list('product_id', 'total')
+    )
+
+
+def shard_total(product_id):
+    """The current total of one sharded product's shards."""
+    return dict(_totals([product_id])).get(product_id, 0)
+
+
+def sold_out(product_ids):
+    """The ids among ``product_ids`` (sharded products) whose shards are empty (one query)."""
+    totals = dict(_totals(product_ids))
+    return [product_id for product_id in product_ids if not totals.get(product_id)]
+
+
+def live_stock(products):
+    """Set ``stock`` on the sharded products among ``products`` to their shards' current total (one query)."""
+    sharded = {product.pk: product for product in products if product.stock_shards}
+    if sharded:
+        totals = dict(_totals(list(sharded)))
+        for product_id, product in sharded.items():
+            product.stock = totals.get(product_id, 0)
+    return products
+
+
+async def alive_stock(products):
+    sharded = {product.pk: product for product in products if product.stock_shards}
+    if sharded:
+        totals = {product_id: total async for product_id, total in _totals(list(sharded))}
+        for product_id, product in sharded.items():
+            product.stock = totals.get(product_id, 0)
+    return products
@@ -0,0 +1,96 @@
+"""
+Load comparison of the catalog pages under WSGI (sync views, one thread per
+concurrent client) and ASGI (async views, one event loop), driven in-process
+through Django's WSGI and ASGI handlers by N concurrent clients.
+
+Each mode runs in its own process with ``ASYNC_CATALOG_VIEWS`` set accordingly,
+since the URLconf picks the views at import time.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from store.benchmarks import summarize
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Compare catalog page throughput under WSGI (sync views) and ASGI (async views)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per mode')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            for mode in ('wsgi', 'asgi'):
+                env = dict(os.environ, ASYNC_CATALOG_VIEWS='True' if mode == 'asgi' else 'False')
+                subprocess.run([
+                    sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_async', '--mode', mode,
+                    '--clients', str(options['clients']), '--requests', str(options['requests']),
+                ], env=env, check=True)
+            return
+
+        setup_test_environment()
+        urls = [reverse('store:home'), reverse('store:shop'), reverse('store:shop') + '?gender=F&page=2']
+        urls += [reverse('store:product_detail', args=[slug])
+                 for slug in Product.objects.filter(is_active=True).values_list('slug', flat=True)[:5]]
+        targets = [urls[i % len(urls)] for i in range(options['requests'])]
+        for url in urls:  # warm the caches the same way for both modes
+            Client().get(url)
+
+        start = time.perf_counter()
+        if options['mode'] == 'wsgi':
+            samples, peak_threads = self._run_wsgi(targets, options['clients'])
+        else:
+            samples, peak_threads = asyncio.run(self._run_asgi(targets, options['clients']))
+        elapsed = time.perf_counter() - start
+
+        views = 'async' if settings.ASYNC_CATALOG_VIEWS else 'sync'
+        s = summarize(samples)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["mode"].upper()} ({views} views), {options["clients"]} concurrent clients'))
+        self.stdout.write(f'  {len(samples)} requests in {elapsed:.2f}s = {len(samples) / elapsed:.1f} req/s')
+        self.stdout.write(f'  latency p50 {s["p50_ms"]:.1f} ms, p95 {s["p95_ms"]:.1f} ms, max {s["max_ms"]:.1f} ms')
+        self.stdout.write(f'  peak threads {peak_threads}')
+
+    def _run_wsgi(self, targets, clients):
+        samples, peak = [], [threading.active_count()]
+
+        def fetch(url):
+            started = time.perf_counter()
+            response = Client().get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            samples.append(time.perf_counter() - started)
+            peak[0] = max(peak[0], threading.active_count())
+
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(fetch, targets))
+        return samples, peak[0]
+
+    async def _run_asgi(self, targets, clients):
+        samples, peak = [], [threading.active_count()]
+        queue = list(reversed(targets))
+
+        async def client():
+            c = AsyncClient()
+            while queue:
+                url = queue.pop()
+                started = time.perf_counter()
+                response = await c.get(url)
+                assert response.status_code == 200, (url, response.status_code)
+                samples.append(time.perf_counter() - started)
+                peak[0] = max(peak[0], threading.active_count())
+
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return samples, peak[0]
@@ -0,0 +1,67 @@
+"""
+Benchmark cart edits (add / update / remove) through the test client for each
+cart storage backend, counting database writes per edit. Runs in a transaction
+that is rolled back.
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from store.models import Product
+
+BACKENDS = [
+    'store.cart_storage.SessionCartStorage',
+    'store.cart_storage.SignedCookieCartStorage',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare cart-edit throughput and DB writes between cart storage backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edits', type=int, default=300)
+        parser.add_argument('--products', type=int, default=5)
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(is_active=True, stock__gte=5, seller__isnull=True)[:options['products']])
+        if not products:
+            raise CommandError('Need active products with stock; run load_sample_data first.')
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='bench_cart_user')
+                for backend in BACKENDS:
+                    self._run(backend, user, products, options['edits'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, backend, user, products, edits):
+        with override_settings(CART_STORAGE=backend):
+            client = Client()
+            client.force_login(user)
+            writes = 0
+            start = time.perf_counter()
+            for i in range(edits):
+                product = products[i % len(products)]
+                step = i % 3
+                with CaptureQueriesContext(connection) as ctx:
+                    if step == 0:
+                        client.post(f'/cart/add/{product.id}/', {'quantity': 1, 'next': '/cart/'})
+                    elif step == 1:
+                        client.post(f'/cart/update/{product.id}/', {'quantity': 2})
+                    else:
+                        client.post(f'/cart/remove/{product.id}/')
+                writes += sum(1 for q in ctx.captured_queries
+                              if q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')))
+            elapsed = time.perf_counter() - start
+        name = backend.rsplit('.', 1)[-1]
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(f'  {edits} edits in {elapsed:.2f}s = {edits / elapsed:.0f} edits/s, {elapsed / edits * 1000:.2f} ms/edit')
+        self.stdout.write(f'  database writes: {writes} ({writes / edits:.2f} per edit)')
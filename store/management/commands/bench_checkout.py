@@ -0,0 +1,125 @@
+"""
+Concurrency benchmark for checkout: many threads buy the same SKU at once.
+Reports orders per second, rejected (out of stock) attempts and oversold units.
+``sharded`` runs the atomic checkout against a product whose stock is split
+across ``--shards`` counters (store.inventory), to compare with ``atomic``.
+Creates a throwaway category, product and buyer, and deletes them afterwards,
+with the background tasks the checkouts queued (store.tasks).
+"""
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from store import inventory
+from store.models import Category, Order, OrderItem, Product, Task
+from store.orders import OutOfStock, place_order
+
+
+def legacy_place_order(order, items):
+    """The pre-transaction checkout: per-line create plus a Python-side stock write."""
+    order.total = sum(item['subtotal'] for item in items)
+    order.save()
+    for item in items:
+        OrderItem.objects.create(order=order, product=item['product'], seller=item['product'].seller,
+                                 quantity=item['quantity'], price=item['price'])
+        item['product'].stock -= item['quantity']
+        item['product'].save(update_fields=['stock'])
+
+
+class Command(BaseCommand):
+    help = 'Run parallel checkouts against one SKU and report throughput and oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=50, help='Checkouts per thread')
+        parser.add_argument('--stock', type=int, default=200)
+        parser.add_argument('--quantity', type=int, default=1, help='Units per order')
+        parser.add_argument('--mode', choices=['atomic', 'legacy', 'sharded', 'all'], default='all')
+        parser.add_argument('--shards', type=int, default=inventory.default_shards(), help='Stock shards in sharded mode')
+
+    def handle(self, *args, **options):
+        modes = ['legacy', 'atomic', 'sharded'] if options['mode'] == 'all' else [options['mode']]
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Bench {tag}', slug=f'bench-checkout-{tag}')
+        buyer = User.objects.create(username=f'bench_checkout_{tag}')
+        refresh_pending = Task.objects.filter(name='refresh_related_products', status=Task.PENDING).exists()
+        try:
+            for mode in modes:
+                self._run(mode, category, buyer, options)
+        finally:
+            orders = Order.objects.filter(user=buyer)
+            products = Product.objects.filter(category=category)
+            Task.objects.filter(
+                name__in=['send_order_confirmation', 'notify_sellers'],
+                payload__order_id__in=list(orders.values_list('id', flat=True)),
+            ).delete()
+            Task.objects.filter(
+                name='rebalance_stock',
+                dedupe_key__in=[f'rebalance_stock:{pk}' for pk in products.values_list('id', flat=True)],
+            ).delete()
+            if not refresh_pending:
+                Task.objects.filter(name='refresh_related_products', status=Task.PENDING).delete()
+            orders.delete()
+            buyer.delete()
+            category.delete()
+
+    def _run(self, mode, category, buyer, options):
+        stock, quantity = options['stock'], options['quantity']
+        product = Product.objects.create(
+            name=f'Bench SKU {mode}', slug=f'{category.slug}-{mode}', description='bench',
+            price=Decimal('10.00'), stock=stock, category=category,
+        )
+        if mode == 'sharded':
+            inventory.shard(product, options['shards'])
+        placer = legacy_place_order if mode == 'legacy' else place_order
+        counts = {'ok': 0, 'out_of_stock': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def worker():
+            close_old_connections()
+            try:
+                for _ in range(options['attempts']):
+                    p = Product.objects.get(pk=product.pk)
+                    if mode == 'legacy' and p.stock < quantity:
+                        result = 'out_of_stock'
+                    else:
+                        items = [{'product': p, 'quantity': quantity, 'price': p.price, 'subtotal': p.price * quantity}]
+                        order = Order(user=buyer, email='bench@example.com', first_name='B', last_name='B',
+                                      address='-', city='-', postal_code='-', country='-')
+                        try:
+                            placer(order, items)
+                            result = 'ok'
+                        except OutOfStock:
+                            result = 'out_of_stock'
+                        except OperationalError:
+                            result = 'locked'
+                    with lock:
+                        counts[result] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        product.refresh_from_db()
+        inventory.live_stock([product])
+        sold = sum(OrderItem.objects.filter(product=product).values_list('quantity', flat=True))
+        oversold = max(0, sold - stock)
+        lost_updates = (stock - sold) - product.stock
+        label = f'sharded ({options["shards"]} shards)' if mode == 'sharded' else mode
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: {options["threads"]} threads x {options["attempts"]} attempts, stock {stock}'))
+        self.stdout.write(f'  orders placed   {counts["ok"]} ({counts["ok"] / elapsed:.1f} orders/s over {elapsed:.2f}s)')
+        self.stdout.write(f'  out of stock    {counts["out_of_stock"]}')
+        self.stdout.write(f'  db locked       {counts["locked"]}')
+        self.stdout.write(f'  units sold      {sold}, stock left {product.stock}')
+        style = self.style.ERROR if oversold or lost_updates else self.style.SUCCESS
+        self.stdout.write(style(f'  oversold units  {oversold}, stock drift {lost_updates}'))
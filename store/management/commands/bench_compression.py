@@ -0,0 +1,78 @@
+"""
+Report what compression saves: bytes of every compressible static file against
+its gzip sibling, and bytes plus latency of the main HTML pages served with and
+without ``Accept-Encoding: gzip``.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from store.benchmarks import summarize, time_calls
+from store.models import Product
+from store.staticfiles import COMPRESSIBLE_EXTENSIONS, MIN_COMPRESS_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Report byte savings and latency of pre-compressed static files and gzip HTML'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self._static()
+        self._html(options['repeat'])
+
+    def _static(self):
+        self.stdout.write(self.style.MIGRATE_HEADING('Static files (gzip -9, as written by collectstatic)'))
+        raw_total = gz_total = files = 0
+        for finder in get_finders():
+            for path, storage in finder.list(['CVS', '.*', '*~']):
+                if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                with storage.open(path) as fh:
+                    content = fh.read()
+                compressed = len(gzip.compress(content, compresslevel=9, mtime=0))
+                if len(content) < MIN_COMPRESS_SIZE or compressed >= len(content):
+                    compressed = len(content)
+                raw_total += len(content)
+                gz_total += compressed
+                files += 1
+                if path.startswith('css/') or path.startswith('js/'):
+                    self.stdout.write(f'  {path:<40} {len(content):>9} -> {compressed:>8} bytes')
+        saved = 100 * (1 - gz_total / raw_total) if raw_total else 0
+        self.stdout.write(f'  {files} files: {raw_total} -> {gz_total} bytes ({saved:.1f}% saved)')
+
+    def _html(self, repeat):
+        setup_test_environment()
+        pages = [('home', reverse('store:home')), ('shop', reverse('store:shop')),
+                 ('shop search', reverse('store:shop') + '?q=leather'), ('cart', reverse('store:cart'))]
+        product = Product.objects.filter(is_active=True).first()
+        if product:
+            pages.append(('product detail', reverse('store:product_detail', args=[product.slug])))
+        client = Client()
+        user = User.objects.filter(is_staff=False, is_active=True).first()
+        if user:
+            client.force_login(user)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'HTML pages (compressed at >= {getattr(settings, "GZIP_MIN_LENGTH", 1024)} bytes)'))
+        raw_total = gz_total = 0
+        for label, url in pages:
+            plain = client.get(url)
+            zipped = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            raw_total += len(plain.content)
+            gz_total += len(zipped.content)
+            t_plain = summarize(time_calls(lambda: client.get(url), repeat))
+            t_zipped = summarize(time_calls(lambda: client.get(url, HTTP_ACCEPT_ENCODING='gzip'), repeat))
+            self.stdout.write(
+                f'  {label:<16} {len(plain.content):>8} -> {len(zipped.content):>7} bytes   '
+                f'p50 {t_plain["p50_ms"]:7.2f} ms -> {t_zipped["p50_ms"]:7.2f} ms '
+                f'({zipped.get("Content-Encoding", "identity")})'
+            )
+        saved = 100 * (1 - gz_total / raw_total) if raw_total else 0
+        self.stdout.write(f'  total: {raw_total} -> {gz_total} bytes ({saved:.1f}% saved)')
@@ -0,0 +1,62 @@
+"""
+Benchmark conditional GET on catalog pages: a full render against a revalidation
+that sends back the page's ETag / Last-Modified and gets 304 Not Modified.
+Fails if a revalidation is not answered with 304.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from store.benchmarks import format_summary, time_calls
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Compare full renders with 304 revalidations on home, shop and product pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--anonymous', action='store_true', help='Browse logged out (crawler)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        pages = [('home', reverse('store:home')), ('shop', reverse('store:shop'))]
+        product = Product.objects.filter(is_active=True).first()
+        if product:
+            pages.append(('product detail', reverse('store:product_detail', args=[product.slug])))
+        client = Client()
+        user = User.objects.filter(is_staff=False, is_active=True).first()
+        if user and not options['anonymous']:
+            client.force_login(user)
+        # Pages with a form (e.g. add to cart) set the CSRF cookie, which every ETag mixes in:
+        # render them all once so the ETags compared below are the ones a returning browser sends.
+        for _label, url in pages:
+            client.get(url)
+
+        failed = [label for label, url in pages if self._compare(client, label, url, options['repeat']) != 304]
+        if failed:
+            raise CommandError(f'Revalidation did not return 304 for: {", ".join(failed)}')
+
+    def _compare(self, client, label, url, repeat):
+        """Print full render vs revalidation timings for ``url``; returns the revalidation's status code."""
+        first = client.get(url)
+        headers = {}
+        if first.has_header('ETag'):
+            headers['HTTP_IF_NONE_MATCH'] = first['ETag']
+        if first.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = first['Last-Modified']
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        full_queries = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            revalidated = client.get(url, **headers)
+        conditional_queries = len(ctx.captured_queries)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{label}: {len(first.content)} bytes, revalidation -> {revalidated.status_code}'))
+        self.stdout.write(f'{format_summary("  full render", time_calls(lambda: client.get(url), repeat))}'
+                          f'   {full_queries} queries')
+        self.stdout.write(f'{format_summary("  conditional GET", time_calls(lambda: client.get(url, **headers), repeat))}'
+                          f'   {conditional_queries} queries')
+        return revalidated.status_code
@@ -0,0 +1,48 @@
+"""
+Benchmark the admin dashboard counters: the original five COUNT queries, the
+cached snapshot (warm), and a forced recount (``?refresh=1``). Also checks that
+the cached counters agree with a fresh recount.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from store import dashboard
+from store.benchmarks import format_summary, time_calls
+from store.models import Order, Product
+
+
+def legacy_stats():
+    threshold = dashboard.low_stock_threshold()
+    return {
+        'total_orders': Order.objects.count(),
+        'pending_orders': Order.objects.filter(status='P').count(),
+        'total_users': get_user_model().objects.filter(is_staff=False).count(),
+        'low_stock_products': Product.objects.filter(stock__lte=threshold, stock__gt=0).count(),
+        'out_of_stock': Product.objects.filter(stock=0).count(),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare dashboard counter queries: per-counter COUNTs vs cached snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        cached = dashboard.get_stats()
+        legacy = legacy_stats()
+        if cached != legacy:
+            self.stdout.write(self.style.WARNING(f'Cached counters differ from a recount: {cached} vs {legacy}'))
+
+        cases = [
+            ('legacy (5 COUNTs)', legacy_stats),
+            ('snapshot, warm', dashboard.get_stats),
+            ('snapshot, refresh=1', lambda: dashboard.get_stats(refresh=True)),
+        ]
+        for label, fn in cases:
+            with CaptureQueriesContext(connection) as ctx:
+                fn()
+            samples = time_calls(fn, repeat)
+            self.stdout.write(f'{format_summary(label, samples)}   {len(ctx.captured_queries)} queries')
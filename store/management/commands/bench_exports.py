@@ -0,0 +1,64 @@
+"""
+Benchmark the streaming order exports: rows per second, bytes, and peak Python
+memory while the response is consumed (tracemalloc), for the buyer, seller and
+staff exports in CSV and JSON lines. Run it on a large dataset
+(``generate_load_data``) to check that memory stays flat as rows grow.
+"""
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = 'Measure rows/s and peak memory of the streaming CSV / JSONL order exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'both'], default='both')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the (slower) tracemalloc pass')
+
+    def handle(self, *args, **options):
+        formats = ['csv', 'jsonl'] if options['format'] == 'both' else [options['format']]
+        targets = []
+        buyer = User.objects.annotate(n=Count('orders')).order_by('-n').first()
+        if buyer:
+            targets.append(('buyer orders', buyer, reverse('accounts:order_history_export')))
+        seller = User.objects.annotate(n=Count('sold_items')).order_by('-n').first()
+        if seller:
+            targets.append(('seller sales', seller, reverse('store:my_sales_export')))
+        staff = User.objects.filter(is_staff=True).first()
+        if staff:
+            targets.append(('all orders (staff)', staff, reverse('store:orders_export')))
+
+        for label, user, url in targets:
+            client = Client()
+            client.force_login(user)
+            for fmt in formats:
+                rows, size, elapsed = self._consume(client, f'{url}?format={fmt}')
+                line = (f'{label + " " + fmt:<26} {rows:>9} rows {size / 1e6:8.1f} MB in {elapsed:6.2f}s '
+                        f'= {rows / elapsed if elapsed else 0:>9,.0f} rows/s')
+                if not options['no_memory']:
+                    tracemalloc.start()
+                    self._consume(client, f'{url}?format={fmt}')
+                    _current, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    line += f'   peak {peak / 1e6:6.1f} MB'
+                self.stdout.write(line)
+
+    @staticmethod
+    def _consume(client, url):
+        start = time.perf_counter()
+        response = client.get(url)
+        rows = size = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            rows += chunk.count(b'\n')
+        response.close()
+        elapsed = time.perf_counter() - start
+        if url.endswith('csv'):
+            rows -= 1  # header
+        return rows, size, elapsed
@@ -0,0 +1,75 @@
+"""
+Benchmark shop search: the FTS5 index against the old icontains scan.
+Use --synthetic N to add N throwaway products (rolled back afterwards).
+"""
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from store import search
+from store.benchmarks import format_summary, time_calls
+from store.models import Category, Product
+
+WORDS = [
+    'leather', 'silver', 'gold', 'classic', 'vintage', 'watch', 'bracelet', 'ring', 'belt', 'bag',
+    'sunglasses', 'pearl', 'scarf', 'minimalist', 'elegant', 'handcrafted', 'brown', 'black', 'rose', 'aviator',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text index search with icontains search on the shop queryset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0, help='Temporary products to add before measuring')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--query', action='append', dest='queries', help='Search text (repeatable)')
+
+    def handle(self, *args, **options):
+        if not search.fts_supported():
+            raise CommandError('The full-text index is only available on SQLite.')
+        try:
+            with transaction.atomic():
+                if options['synthetic']:
+                    self._add_synthetic(options['synthetic'])
+                self._run(options['queries'] or ['leather', 'gold bracelet', 'vint', 'aviator sunglasses'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _add_synthetic(self, count):
+        category = Category.objects.order_by('id').first() or Category.objects.create(name='Bench', slug='bench-search')
+        rng = random.Random(1)
+        batch = []
+        for i in range(count):
+            words = rng.sample(WORDS, 6)
+            batch.append(Product(
+                name=' '.join(words[:3]).title(), slug=f'bench-search-{i}',
+                description=' '.join(words) + f' item {i}', price=10, stock=1, category=category,
+            ))
+            if len(batch) == 1000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        self.stdout.write(f'Added {count} synthetic products ({Product.objects.count()} total).')
+
+    def _run(self, queries, repeat):
+        base = Product.objects.filter(is_active=True)
+        for q in queries:
+            def icontains():
+                qs = base.filter(Q(name__icontains=q) | Q(description__icontains=q))
+                qs.count()
+                list(qs[:12])
+
+            def fts():
+                results = search.search_products(base, q)
+                results.count()
+                list(results[:12])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'q={q!r}'))
+            self.stdout.write(format_summary('  icontains', time_calls(icontains, repeat)))
+            self.stdout.write(format_summary('  fts5', time_calls(fts, repeat)))
@@ -0,0 +1,203 @@
+"""
+Per-view benchmark suite: drive the main pages through the test client and
+record wall-time percentiles and SQL query counts for each, then compare them
+with a JSON baseline.
+
+Fails (non-zero exit) when a view issues more queries than its budget below or
+than the baseline recorded, or when its median time regresses past
+``--tolerance``. Run it against a realistic dataset (``generate_load_data``)
+and record the baseline with ``--update``. Everything runs in a transaction
+that is rolled back, so checkout POSTs leave no orders behind, and against a
+private local-memory cache, so the dashboard counters and facet counts of
+those rows never reach the shared cache.
+
+    python manage.py bench_views --update
+    python manage.py bench_views --tolerance 0.3
+"""
+import json
+import platform
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from store.benchmarks import isolated_cache, summarize
+from store.models import Category, Product
+
+# Hard ceilings on queries per request, whatever the data size. A view that
+# grows an N+1 blows through these long before it shows up in timings.
+QUERY_BUDGETS = {
+    'home': 6,
+    'shop': 8,
+    'shop filtered': 8,
+    'shop search': 8,
+    'shop deep page': 8,
+    'product_detail': 8,
+    'cart_view': 10,
+    'checkout GET': 10,
+    'checkout POST': 20,
+    'my_listings': 10,
+    'my_sales': 10,
+    'order_history': 10,
+    'admin_dashboard': 10,
+}
+CHECKOUT_DATA = {
+    'email': 'bench@example.com', 'first_name': 'Bench', 'last_name': 'Buyer', 'address': '1 Main St',
+    'city': 'Paris', 'postal_code': '75001', 'country': 'France', 'phone': '',
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Scenario:
+    def __init__(self, label, client, url, data=None, method='get', setup=None, expect=200):
+        self.label, self.client, self.url = label, client, url
+        self.method, self.data, self.setup, self.expect = method, data, setup, expect
+
+    def run(self):
+        """Prepare (untimed), then issue the request; returns its wall time."""
+        if self.setup:
+            self.setup()
+        return self.request()
+
+    def request(self):
+        start = time.perf_counter()
+        response = getattr(self.client, self.method)(self.url, self.data)
+        elapsed = time.perf_counter() - start
+        if response.status_code != self.expect:
+            raise CommandError(f'{self.label}: {self.method.upper()} {self.url} returned {response.status_code}')
+        return elapsed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-view latency and query counts against a JSON baseline and query budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per view')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'bench_views.json'))
+        parser.add_argument('--update', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown vs baseline (0.25 = 25%%)')
+        parser.add_argument('--slack-ms', type=float, default=2.0, help='Absolute p50 slowdown always tolerated')
+        parser.add_argument('--only', action='append', default=[], help='Run only this view label (repeatable)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        baseline_path = Path(options['baseline'])
+        baseline = json.loads(baseline_path.read_text())['views'] if baseline_path.exists() else {}
+        results = {}
+        try:
+            with isolated_cache(), transaction.atomic():
+                for scenario in self._scenarios():
+                    if options['only'] and scenario.label not in options['only']:
+                        continue
+                    results[scenario.label] = self._measure(scenario, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        failures = []
+        self.stdout.write(f'{"view":<18} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8} {"queries":>8}   baseline p50 / queries')
+        for label, result in results.items():
+            base = baseline.get(label)
+            line = (f'{label:<18} {result["p50_ms"]:8.2f} {result["p95_ms"]:8.2f} {result["max_ms"]:8.2f} '
+                    f'{result["queries"]:>8}')
+            if base:
+                line += f'   {base["p50_ms"]:8.2f} / {base["queries"]}'
+            self.stdout.write(line)
+            budget = QUERY_BUDGETS.get(label)
+            if budget is not None and result['queries'] > budget:
+                failures.append(f'{label}: {result["queries"]} queries, budget is {budget}')
+            if base and not options['update']:
+                if result['queries'] > base['queries']:
+                    failures.append(f'{label}: {result["queries"]} queries, baseline had {base["queries"]}')
+                limit = base['p50_ms'] * (1 + options['tolerance']) + options['slack_ms']
+                if result['p50_ms'] > limit:
+                    failures.append(f'{label}: p50 {result["p50_ms"]:.2f} ms, baseline {base["p50_ms"]:.2f} ms '
+                                    f'(limit {limit:.2f} ms)')
+
+        if options['update']:
+            merged = {**baseline, **results}
+            baseline_path.write_text(json.dumps({
+                'meta': {
+                    'products': Product.objects.count(),
+                    'users': User.objects.count(),
+                    'repeat': options['repeat'],
+                    'python': platform.python_version(),
+                    'database': connection.vendor,
+                },
+                'views': merged,
+            }, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(f'Baseline written to {baseline_path}')
+        elif not baseline:
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}; only query budgets were checked.'))
+        if failures:
+            for failure in failures:
+                self.stderr.write(f'  {failure}')
+            raise CommandError(f'{len(failures)} benchmark regression{"" if len(failures) == 1 else "s"}.')
+        self.stdout.write(self.style.SUCCESS('All views within budget.'))
+
+    def _measure(self, scenario, repeat):
+        scenario.run()  # warm caches, sessions and the template loader
+        if scenario.setup:
+            scenario.setup()
+        with CaptureQueriesContext(connection) as ctx:
+            scenario.request()
+        queries = len(ctx.captured_queries)
+        samples = [scenario.run() for _ in range(repeat)]
+        return {**{k: round(v, 3) for k, v in summarize(samples).items()}, 'queries': queries}
+
+    def _login(self, user):
+        client = Client()
+        if user:
+            client.force_login(user)
+        return client
+
+    def _scenarios(self):
+        anon = Client()
+        yield Scenario('home', anon, reverse('store:home'))
+        yield Scenario('shop', anon, reverse('store:shop'))
+        category = Category.objects.annotate(n=Count('products')).order_by('-n').first()
+        if category:
+            yield Scenario('shop filtered', anon, reverse('store:shop_women'),
+                           {'category': category.slug, 'price': '50-100'})
+        yield Scenario('shop search', anon, reverse('store:shop'), {'q': 'leather'})
+        pages = max(1, Product.objects.filter(is_active=True).count() // 12)
+        yield Scenario('shop deep page', anon, reverse('store:shop'), {'page': max(1, pages * 9 // 10)})
+
+        products = list(Product.objects.filter(is_active=True, stock__gte=50, seller=None)[:3])
+        if products:
+            yield Scenario('product_detail', anon, reverse('store:product_detail', args=[products[0].slug]))
+
+        buyer = (User.objects.filter(is_staff=False, is_active=True, products_for_sale=None)
+                 .annotate(n=Count('orders')).order_by('-n').first())
+        if buyer and products:
+            shopper = self._login(buyer)
+            for product in products:
+                shopper.post(reverse('store:cart_add', args=[product.pk]), {'quantity': 1})
+            yield Scenario('cart_view', shopper, reverse('store:cart'))
+            yield Scenario('checkout GET', shopper, reverse('store:checkout'))
+
+            purchaser = self._login(buyer)
+
+            def fill_cart():
+                purchaser.post(reverse('store:cart_add', args=[products[0].pk]), {'quantity': 1})
+            yield Scenario('checkout POST', purchaser, reverse('store:checkout'), CHECKOUT_DATA, method='post',
+                           setup=fill_cart, expect=302)
+            yield Scenario('order_history', self._login(buyer), reverse('accounts:order_history'))
+
+        seller = User.objects.annotate(n=Count('products_for_sale')).filter(n__gt=0).order_by('-n').first()
+        if seller:
+            client = self._login(seller)
+            yield Scenario('my_listings', client, reverse('store:my_listings'))
+            yield Scenario('my_sales', client, reverse('store:my_sales'))
+        staff = User.objects.filter(is_staff=True).first()
+        if staff:
+            yield Scenario('admin_dashboard', self._login(staff), reverse('store:admin_dashboard'))
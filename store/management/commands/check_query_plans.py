@@ -0,0 +1,132 @@
+"""
+Run the hot views through the test client, EXPLAIN QUERY PLAN every SELECT they
+issue, and fail if any of them falls back to a full table scan (SQLite only).
+All requests run in a transaction that is rolled back, after seeding the rows
+they need (a category, a seller with a listing, an order with a sold item, a
+staff user), so every scenario runs even on an empty database. The run uses
+a private local-memory cache, so nothing it counts reaches the shared cache.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from store.benchmarks import isolated_cache
+from store.models import Category, Order, OrderItem, Product
+
+# Tables that may be scanned: tiny lookup tables, and auth_user for the
+# dashboard's non-staff count (no index on auth.User that we control).
+DEFAULT_ALLOWED = {'store_category', 'auth_user'}
+
+
+PREFIX = 'queryplan'
+
+
+class Rollback(Exception):
+    pass
+
+
+def full_scans(plan_rows, allowed):
+    """Return the plan lines that scan a whole table without an index."""
+    bad = []
+    for row in plan_rows:
+        detail = row[-1]
+        if not detail.startswith('SCAN '):
+            continue
+        table = detail.split()[1]
+        if 'USING' in detail or 'VIRTUAL TABLE' in detail or table in allowed:
+            continue
+        bad.append(detail)
+    return bad
+
+
+class Command(BaseCommand):
+    help = 'Fail if any query issued by the catalog, seller, order or dashboard views does a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--allow', action='append', default=[], help='Extra table allowed to be scanned (repeatable)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN checks are written for SQLite.')
+        self.allowed = DEFAULT_ALLOWED | set(options['allow'])
+        self.verbose_plans = options['verbose_plans']
+        self.failures = []
+        try:
+            with isolated_cache(), transaction.atomic():
+                self._check_all()
+                raise Rollback
+        except Rollback:
+            pass
+        if self.failures:
+            for label, sql, scans in self.failures:
+                self.stderr.write(f'{label}: {", ".join(scans)}\n    {sql[:300]}')
+            raise CommandError(f'{len(self.failures)} quer{"y" if len(self.failures) == 1 else "ies"} fell back to a full scan.')
+        self.stdout.write(self.style.SUCCESS('No full table scans.'))
+
+    def _seed(self):
+        """The rows every scenario needs, created inside the rolled-back transaction."""
+        category = Category.objects.create(name=f'{PREFIX} category', slug=f'{PREFIX}-category')
+        seller = User.objects.create_user(f'{PREFIX}_seller', f'{PREFIX}_seller@example.com')
+        buyer = User.objects.create_user(f'{PREFIX}_buyer', f'{PREFIX}_buyer@example.com')
+        staff = User.objects.create_user(f'{PREFIX}_staff', f'{PREFIX}_staff@example.com', is_staff=True)
+        product = Product.objects.create(
+            name=f'{PREFIX} ring', slug=f'{PREFIX}-ring', description='', price=10, stock=5,
+            category=category, seller=seller, gender='F',
+        )
+        order = Order.objects.create(
+            user=buyer, email=buyer.email, first_name='Query', last_name='Plan', address='1 Street',
+            city='City', postal_code='1000', country='Country', total=10,
+        )
+        OrderItem.objects.create(order=order, product=product, seller=seller, quantity=1, price=10)
+        return category, product, seller, buyer, staff
+
+    def _client(self, user=None):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def _requests(self):
+        """(label, client, method, url, data, expected status) for every scenario."""
+        category, product, seller, buyer, staff = self._seed()
+        anon = self._client()
+        yield 'home', anon, 'get', '/', None, 200
+        yield 'shop', anon, 'get', '/shop/', None, 200
+        yield 'shop men', anon, 'get', '/shop/men/', None, 200
+        yield 'shop deep page', anon, 'get', '/shop/?page=3', None, 200
+        yield 'shop search', anon, 'get', '/shop/?q=leather', None, 200
+        yield 'shop category', anon, 'get', f'/shop/?category={category.slug}', None, 200
+        yield 'shop category+gender', anon, 'get', f'/shop/?category={category.slug}&gender=F', None, 200
+        yield 'product_detail', anon, 'get', f'/product/{product.slug}/', None, 200
+
+        seller_client = self._client(seller)
+        yield 'my_listings', seller_client, 'get', '/my-listings/', None, 200
+        yield 'my_sales', seller_client, 'get', '/my-sales/', None, 200
+        yield 'add_listing POST', seller_client, 'post', '/my-listings/add/', {
+            'name': f'{PREFIX} ring', 'description': 'Query plan check', 'price': '12.50', 'stock': '3',
+            'category': category.pk, 'gender': 'U',
+        }, 302
+        yield 'order_history', self._client(buyer), 'get', '/accounts/orders/', None, 200
+        yield 'admin_dashboard', self._client(staff), 'get', '/admin-dashboard/', None, 200
+
+    def _check_all(self):
+        for label, client, method, url, data, expected in self._requests():
+            with CaptureQueriesContext(connection) as ctx:
+                response = getattr(client, method)(url, data)
+            if response.status_code != expected:
+                raise CommandError(f'{label}: {method.upper()} {url} returned {response.status_code}, expected {expected}')
+            selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+            self.stdout.write(f'{label:<24} {len(selects)} selects')
+            for sql in selects:
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plan = cursor.fetchall()
+                if self.verbose_plans:
+                    self.stdout.write(f'    {sql[:160]}')
+                    for row in plan:
+                        self.stdout.write(f'      {row[-1]}')
+                scans = full_scans(plan, self.allowed)
+                if scans:
+                    self.failures.append((label, sql, scans))
@@ -0,0 +1,252 @@
+"""
+Generate a large, deterministic synthetic marketplace for load testing and the
+``bench_*`` commands: users (buyers and sellers), categories, products, orders
+and order items, written with batched ``bulk_create``.
+
+The same ``--seed`` and counts always produce the same data. Distributions
+aim to look like a real shop: product popularity is Zipf-like (a few products
+get most orders), category sizes and seller catalogues are skewed, gender is
+mixed 40/45/15 (men/women/unisex), prices are log-normal and order dates
+spread over the last year. All users share one precomputed password hash.
+
+    python manage.py generate_load_data --users 100000 --products 500000 --orders 1000000
+"""
+import math
+import random
+import time
+from array import array
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from accounts.models import UserProfile
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from store import dashboard, seller_stats
+from store.catalog import bump_catalog_version, invalidate_categories
+from store.models import Category, Order, OrderItem, Product
+
+CATEGORY_NAMES = [
+    'Watches', 'Jewelry', 'Bags', 'Sunglasses', 'Belts', 'Scarves', 'Wallets', 'Hats', 'Cufflinks',
+    'Hair Accessories', 'Keychains', 'Gloves', 'Ties', 'Anklets', 'Brooches', 'Phone Cases',
+]
+ADJECTIVES = ['Classic', 'Vintage', 'Minimalist', 'Elegant', 'Handcrafted', 'Modern', 'Rose Gold', 'Silver',
+              'Leather', 'Pearl', 'Braided', 'Oversized', 'Slim', 'Matte', 'Polished', 'Woven']
+NOUNS = ['Watch', 'Bracelet', 'Ring', 'Necklace', 'Belt', 'Bag', 'Clutch', 'Sunglasses', 'Scarf', 'Wallet',
+         'Earrings', 'Pendant', 'Cap', 'Tote', 'Backpack', 'Cuff']
+GENDER_WEIGHTS = [('M', 40), ('F', 45), ('U', 15)]
+STATUS_WEIGHTS = [('P', 10), ('C', 15), ('S', 20), ('D', 50), ('X', 5)]
+CITIES = ['New York', 'London', 'Paris', 'Berlin', 'Madrid', 'Toronto', 'Sydney', 'Tokyo', 'Algiers', 'Lagos']
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the created_at / updated_at values set on the objects."""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def zipf_cum_weights(n, s, rng):
+    """Cumulative Zipf(s) weights over ``n`` items in a shuffled (but seeded) rank order."""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(1 / r ** s for r in ranks))
+
+
+class Command(BaseCommand):
+    help = 'Generate a large seeded synthetic dataset (users, products, orders) with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='load', help='Prefix for generated usernames, slugs and emails')
+        parser.add_argument('--users', type=int, default=2000, help='Buyers')
+        parser.add_argument('--sellers', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--items-per-order', type=float, default=2.0, help='Mean order lines per order')
+        parser.add_argument('--popularity-skew', type=float, default=1.1, help='Zipf exponent for product popularity')
+        parser.add_argument('--password', default='loadtest123', help='Password for every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = slugify(options['prefix']) or 'load'
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        if User.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise CommandError(f'Users named {self.prefix}_* already exist; pass another --prefix.')
+
+        started = time.perf_counter()
+        buyers = self._users('buyer', options['users'], options['password'])
+        sellers = self._users('seller', options['sellers'], options['password'])
+        categories = self._categories(options['categories'])
+        products = self._products(options['products'], categories, sellers)
+        self._orders(options['orders'], options['items_per_order'], options['popularity_skew'],
+                     buyers, products)
+
+        self._step('seller stats', lambda: seller_stats.rebuild(list(sellers)))
+        invalidate_categories()
+        bump_catalog_version()
+        for group in dashboard.GROUPS:
+            dashboard.invalidate(group)
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s.'))
+
+    # --- helpers ---
+
+    def _step(self, label, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.stdout.write(f'  {label:<16} {time.perf_counter() - start:7.1f}s')
+        return result
+
+    def _insert(self, label, model, objects, total):
+        """bulk_create an iterable of unsaved objects in batches; returns their pks."""
+        pks = array('q')
+        start = time.perf_counter()
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                pks.extend(self._flush(model, batch))
+                batch = []
+        if batch:
+            pks.extend(self._flush(model, batch))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'  {label:<16} {total:>9} rows in {elapsed:6.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)')
+        return pks
+
+    @staticmethod
+    def _flush(model, batch):
+        with transaction.atomic():
+            created = model.objects.bulk_create(batch, batch_size=500)
+        return [obj.pk for obj in created]
+
+    def _days_ago(self, max_days):
+        return self.now - timedelta(seconds=self.rng.random() * max_days * 86400)
+
+    def _users(self, role, count, password):
+        # One hash for everybody: the full-cost hasher once instead of once per user.
+        password_hash = make_password(password)
+        joined = self.now - timedelta(days=400)
+        users = (
+            User(username=f'{self.prefix}_{role}_{n}', email=f'{self.prefix}_{role}_{n}@example.com',
+                 password=password_hash, first_name=role.title(), last_name=str(n), date_joined=joined)
+            for n in range(count)
+        )
+        pks = self._insert(f'{role}s', User, users, count)
+        # Registration creates a profile for every account; bulk_create sends no signals to do it here.
+        self._insert(f'{role} profiles', UserProfile, (UserProfile(user_id=pk) for pk in pks), count)
+        return pks
+
+    def _categories(self, count):
+        """The first ``count`` names from CATEGORY_NAMES, reusing categories that already exist."""
+        existing = dict(Category.objects.values_list('slug', 'pk'))
+        names = [
+            CATEGORY_NAMES[n % len(CATEGORY_NAMES)] + (f' {n // len(CATEGORY_NAMES) + 1}' if n >= len(CATEGORY_NAMES) else '')
+            for n in range(count)
+        ]
+        missing = [Category(name=name, slug=slugify(name)) for name in names if slugify(name) not in existing]
+        existing.update(zip((c.slug for c in missing), self._insert('categories', Category, missing, len(missing))))
+        return array('q', (existing[slugify(name)] for name in names))
+
+    def _products(self, count, categories, sellers):
+        rng = self.rng
+        category_weights = zipf_cum_weights(len(categories), 0.8, rng)
+        seller_weights = zipf_cum_weights(len(sellers), 1.0, rng) if sellers else None
+        genders, gender_weights = zip(*GENDER_WEIGHTS)
+        gender_cum = list(accumulate(gender_weights))
+        self.prices = array('d')
+        self.product_sellers = array('q')
+
+        def generate():
+            for n in range(count):
+                price = round(min(2000.0, math.exp(rng.gauss(4.2, 0.8))), 2)
+                # About 30% official listings (no seller), the rest from skewed seller catalogues.
+                seller_id = sellers[bisect(seller_weights, rng.random() * seller_weights[-1])] \
+                    if sellers and rng.random() > 0.3 else None
+                roll = rng.random()
+                stock = 0 if roll < 0.03 else rng.randint(1, 5) if roll < 0.08 else rng.randint(6, 200)
+                self.prices.append(price)
+                self.product_sellers.append(seller_id or 0)
+                created = self._days_ago(365)
+                yield Product(
+                    name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n}',
+                    slug=f'{self.prefix}-product-{n}',
+                    description='Synthetic product for load testing.',
+                    price=Decimal(f'{price:.2f}'),
+                    stock=stock,
+                    category_id=categories[bisect(category_weights, rng.random() * category_weights[-1])],
+                    gender=genders[bisect(gender_cum, rng.random() * gender_cum[-1])],
+                    seller_id=seller_id,
+                    is_active=rng.random() > 0.02,
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        fields = [Product._meta.get_field('created_at'), Product._meta.get_field('updated_at')]
+        with explicit_timestamps(*fields):
+            return self._insert('products', Product, generate(), count)
+
+    def _orders(self, count, items_per_order, skew, buyers, products):
+        if not products or not buyers:
+            return
+        rng = self.rng
+        popularity = zipf_cum_weights(len(products), skew, rng)
+        buyer_weights = zipf_cum_weights(len(buyers), 0.6, rng)
+        statuses, status_weights = zip(*STATUS_WEIGHTS)
+        status_cum = list(accumulate(status_weights))
+        # Geometric number of lines with the requested mean (at least one).
+        p_more = 1 - 1 / max(items_per_order, 1.0)
+        fields = [Order._meta.get_field('created_at'), Order._meta.get_field('updated_at')]
+
+        order_count = item_count = 0
+        start = time.perf_counter()
+        with explicit_timestamps(*fields):
+            for batch_start in range(0, count, self.batch_size):
+                orders, lines = [], []
+                for _ in range(min(self.batch_size, count - batch_start)):
+                    order_lines = {}
+                    while True:
+                        index = bisect(popularity, rng.random() * popularity[-1])
+                        order_lines[index] = order_lines.get(index, 0) + (1 if rng.random() < 0.85 else 2)
+                        if rng.random() >= p_more:
+                            break
+                    total = sum(Decimal(f'{self.prices[i]:.2f}') * q for i, q in order_lines.items())
+                    created = self._days_ago(365)
+                    user_id = buyers[bisect(buyer_weights, rng.random() * buyer_weights[-1])]
+                    orders.append(Order(
+                        user_id=user_id, email=f'{self.prefix}_{user_id}@example.com', first_name='Load',
+                        last_name='Tester', address=f'{rng.randint(1, 999)} Main St', city=rng.choice(CITIES),
+                        postal_code=f'{rng.randint(10000, 99999)}', country='US',
+                        status=statuses[bisect(status_cum, rng.random() * status_cum[-1])],
+                        total=total, created_at=created, updated_at=created,
+                    ))
+                    lines.append(order_lines)
+                with transaction.atomic():
+                    created_orders = Order.objects.bulk_create(orders, batch_size=500)
+                    items = [
+                        OrderItem(order_id=order.pk, product_id=products[i], seller_id=self.product_sellers[i] or None,
+                                  quantity=q, price=Decimal(f'{self.prices[i]:.2f}'))
+                        for order, order_lines in zip(created_orders, lines) for i, q in order_lines.items()
+                    ]
+                    OrderItem.objects.bulk_create(items, batch_size=500)
+                order_count += len(orders)
+                item_count += len(items)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'  {"orders":<16} {order_count:>9} rows + {item_count} items in {elapsed:6.1f}s '
+            f'({(order_count + item_count) / elapsed if elapsed else 0:,.0f} rows/s)'
+        )
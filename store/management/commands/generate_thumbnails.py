@@ -0,0 +1,33 @@
+"""
+Backfill WebP/JPEG thumbnail variants for every stored product, gallery,
+category and avatar image, on a process pool.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from store import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive image variants for existing media'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes (1 = inline)')
+
+    def handle(self, *args, **options):
+        names = thumbnails.image_names()
+        if not names:
+            self.stdout.write('No images to process.')
+            return
+        start = time.perf_counter()
+        written = processed = 0
+        for count in thumbnails.generate_many(names, force=options['force'], workers=options['workers']):
+            processed += 1
+            written += count
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} images, {written} variants written in {elapsed:.2f}s '
+            f'({processed / elapsed:.1f} images/s, {options["workers"]} workers)'
+        ))
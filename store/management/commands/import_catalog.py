@@ -0,0 +1,288 @@
+"""
+Stream a product feed (CSV or JSON lines) into the catalog.
+
+Columns / keys: name, price, category (slug or name) are required for new
+products; description, stock, gender (M/F/U), seller (username), is_active and
+slug are optional. Rows with a ``slug`` that already exists update that
+product; a ``slug`` that does not exist yet is created as given, and rows
+without one get a unique slug allocated from the name (store.slugs).
+
+Rows are read one at a time and written in batches with ``bulk_create`` /
+``bulk_update``, so memory stays flat however long the feed is. Categories and
+sellers are resolved from in-memory maps; the batch's slugs are looked up with
+one ``slug__in`` query (plus one per 100 name bases for new slugs) instead of
+one query per row. If a concurrent writer takes one of the new slugs first,
+the batch is planned again from a fresh lookup.
+
+    python manage.py import_catalog feed.csv
+    zcat feed.jsonl.gz | python manage.py import_catalog - --format jsonl
+"""
+import csv
+import io
+import json
+import resource
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from store import dashboard
+from store.catalog import bump_catalog_version
+from store.models import GENDER_CHOICES, Category, Product
+from store.slugs import RETRIES, SlugAllocator
+
+GENDERS = {value for value, _label in GENDER_CHOICES}
+UPDATABLE_FIELDS = ['name', 'description', 'price', 'stock', 'category', 'gender', 'seller', 'is_active']
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+PRICE_FIELD = Product._meta.get_field('price')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+# Slugs per ``slug__in`` lookup (stays under SQLite's bound-parameter limit).
+LOOKUP_CHUNK = 500
+
+
+class RowError(ValueError):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Import (create or update) products from a CSV or JSONL file, or stdin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension, csv for stdin')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--create-categories', action='store_true', help='Create unknown categories instead of skipping the row')
+        parser.add_argument('--max-errors', type=int, default=10, help='How many row errors to print')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        self.batch_size = options['batch_size']
+        self.create_categories = options['create_categories']
+        self.max_errors = options['max_errors']
+        self.now = timezone.now()
+
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[category.slug] = category.pk
+            self.categories.setdefault(category.name.lower(), category.pk)
+        self.sellers = {}
+        self.stats = {'created': 0, 'updated': 0, 'errors': 0}
+
+        reading_stdin = options['path'] == '-'
+        if reading_stdin:
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        else:
+            try:
+                stream = open(options['path'], encoding='utf-8', newline='')
+            except OSError as exc:
+                raise CommandError(exc)
+        start = time.perf_counter()
+        rows = 0
+        try:
+            batch = []
+            for line_no, row in self._rows(stream, fmt):
+                rows += 1
+                batch.append((line_no, row))
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+                    self._progress(rows, start)
+            if batch:
+                self._write(batch)
+        finally:
+            if reading_stdin:
+                stream.detach()
+            else:
+                stream.close()
+
+        if self.stats['created'] or self.stats['updated']:
+            # bulk_create / bulk_update send no signals.
+            bump_catalog_version()
+            dashboard.invalidate('products')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s): '
+            f'{self.stats["created"]} created, {self.stats["updated"]} updated, {self.stats["errors"]} skipped; '
+            f'peak RSS {self._peak_rss_mb():.0f} MB'
+        ))
+
+    def _rows(self, stream, fmt):
+        """Yield (line number, dict) pairs without reading the whole stream."""
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, self._normalize(row)
+            return
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                self._error(line_no, f'invalid JSON ({exc})')
+                continue
+            if isinstance(row, dict):
+                yield line_no, self._normalize(row)
+            else:
+                self._error(line_no, 'expected a JSON object')
+
+    @staticmethod
+    def _normalize(row):
+        return {key.strip().lower(): value for key, value in row.items() if key}
+
+    def _write(self, batch):
+        self._resolve_sellers(batch)
+        rows = []
+        for line_no, row in batch:
+            try:
+                rows.append((line_no, self._clean(row)))
+            except RowError as exc:
+                self._error(line_no, exc)
+        for attempt in range(RETRIES):
+            creates, updates, errors = self._plan(rows)
+            try:
+                with transaction.atomic():
+                    if creates:
+                        Product.objects.bulk_create(creates, batch_size=500)
+                    for fields, products in updates.items():
+                        Product.objects.bulk_update(products, list(fields) + ['updated_at'], batch_size=500)
+                break
+            except IntegrityError:
+                # A concurrent insert took one of the new slugs: look the batch up again.
+                if attempt == RETRIES - 1:
+                    raise
+        for line_no, message in errors:
+            self._error(line_no, message)
+        self.stats['created'] += len(creates)
+        self.stats['updated'] += sum(len(products) for products in updates.values())
+
+    def _plan(self, rows):
+        """([new Product], {fields: [Product to update]}, [(line, error)]) for cleaned ``rows``."""
+        given = {values['slug'] for _line_no, values in rows if values.get('slug')}
+        existing = self._existing_slugs(given)
+        allocator = SlugAllocator()
+        # Slugs given for new products are used as is; names must not be allocated onto them.
+        allocator.issued.update(given - existing.keys())
+        allocator.prefetch(values['name'] for _line_no, values in rows if not values.get('slug') and 'name' in values)
+        creates, updates, errors = {}, {}, []
+        for line_no, values in rows:
+            values = dict(values)
+            slug = values.pop('slug', None)
+            if slug in creates:
+                # Same new slug twice in one batch: the later row wins.
+                for name, value in values.items():
+                    setattr(creates[slug], name, value)
+                continue
+            pk = existing.get(slug) if slug else None
+            if pk is not None:
+                fields = tuple(name for name in UPDATABLE_FIELDS if name in values or f'{name}_id' in values)
+                updates.setdefault(fields, []).append(Product(pk=pk, updated_at=self.now, **values))
+                continue
+            missing = [name for name in ('name', 'price', 'category_id') if name not in values]
+            if missing:
+                errors.append((line_no, f'new product needs {", ".join(m.removesuffix("_id") for m in missing)}'))
+                continue
+            slug = slug or allocator.allocate(values['name'])
+            values.setdefault('description', '')
+            creates[slug] = Product(slug=slug, **values)
+        return list(creates.values()), updates, errors
+
+    @staticmethod
+    def _existing_slugs(slugs):
+        """{slug: pk} for the ``slugs`` that already exist."""
+        slugs = list(slugs)
+        existing = {}
+        for i in range(0, len(slugs), LOOKUP_CHUNK):
+            existing.update(Product.objects.filter(slug__in=slugs[i:i + LOOKUP_CHUNK]).values_list('slug', 'pk'))
+        return existing
+
+    def _clean(self, row):
+        values = {}
+        name = str(row.get('name') or '').strip()
+        if name:
+            values['name'] = name[:200]
+        if row.get('slug'):
+            values['slug'] = slugify(str(row['slug']))[:SLUG_MAX_LENGTH]
+        if row.get('description') is not None:
+            values['description'] = str(row['description'])
+        if row.get('price') not in (None, ''):
+            try:
+                values['price'] = Decimal(str(row['price'])).quantize(Decimal('0.01'))
+            except InvalidOperation:
+                raise RowError(f'bad price {row["price"]!r}')
+            if not values['price'].is_finite():
+                # NaN survives quantize() and makes the validators' comparisons raise InvalidOperation.
+                raise RowError(f'bad price {row["price"]!r}')
+            try:
+                # Not negative, and no more digits than the column holds (bulk_create would fail the whole batch).
+                PRICE_FIELD.run_validators(values['price'])
+            except ValidationError as exc:
+                raise RowError(f'bad price {row["price"]!r}: {" ".join(exc.messages)}')
+        if row.get('stock') not in (None, ''):
+            try:
+                values['stock'] = int(row['stock'])
+            except (TypeError, ValueError):
+                raise RowError(f'bad stock {row["stock"]!r}')
+            if values['stock'] < 0:
+                raise RowError('negative stock')
+        if row.get('gender') not in (None, ''):
+            gender = str(row['gender']).strip().upper()[:1]
+            if gender not in GENDERS:
+                raise RowError(f'bad gender {row["gender"]!r}')
+            values['gender'] = gender
+        if row.get('category') not in (None, ''):
+            values['category_id'] = self._category(str(row['category']).strip())
+        if row.get('seller') not in (None, ''):
+            seller_id = self.sellers.get(str(row['seller']).strip())
+            if seller_id is None:
+                raise RowError(f'unknown seller {row["seller"]!r}')
+            values['seller_id'] = seller_id
+        if row.get('is_active') not in (None, ''):
+            active = row['is_active']
+            values['is_active'] = active if isinstance(active, bool) else str(active).strip().lower() in TRUE_VALUES
+        return values
+
+    def _category(self, value):
+        pk = self.categories.get(value) or self.categories.get(value.lower()) or self.categories.get(slugify(value))
+        if pk is not None:
+            return pk
+        if not self.create_categories:
+            raise RowError(f'unknown category {value!r}')
+        category = Category.objects.create(name=value[:100], slug=self._unique_category_slug(value))
+        self.categories[category.slug] = self.categories[value.lower()] = category.pk
+        return category.pk
+
+    def _unique_category_slug(self, name):
+        base = slugify(name)[:90] or 'category'
+        slug, n = base, 2
+        while slug in self.categories:
+            slug, n = f'{base}-{n}', n + 1
+        return slug
+
+    def _resolve_sellers(self, batch):
+        wanted = {str(row.get('seller')).strip() for _line, row in batch if row.get('seller') not in (None, '')}
+        wanted -= self.sellers.keys()
+        if wanted:
+            found = dict(User.objects.filter(username__in=wanted).values_list('username', 'pk'))
+            for username in wanted:
+                self.sellers[username] = found.get(username)
+
+    def _error(self, line_no, message):
+        self.stats['errors'] += 1
+        if self.stats['errors'] <= self.max_errors:
+            self.stderr.write(f'  line {line_no}: {message}')
+
+    def _progress(self, rows, start):
+        if rows % (self.batch_size * 25) == 0:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'  {rows} rows, {rows / elapsed:.0f} rows/s, peak RSS {self._peak_rss_mb():.0f} MB')
+
+    @staticmethod
+    def _peak_rss_mb():
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
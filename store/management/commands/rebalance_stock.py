@@ -0,0 +1,27 @@
+"""
+Even out the stock shards of sharded (flash-sale) products and write their
+totals back to ``Product.stock`` (see store.inventory). Checkouts already queue
+a rebalance of the products they took sharded stock from; this covers every
+sharded product at once, optionally every ``--interval`` seconds.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from store import inventory
+
+
+class Command(BaseCommand):
+    help = 'Rebalance sharded product stock and refresh Product.stock from the shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Repeat every N seconds (0 = run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            changed = inventory.rebalance()
+            if options['verbosity'] > 1 or not options['interval']:
+                self.stdout.write(f'{changed} product(s) with new stock totals in {time.perf_counter() - start:.2f}s.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
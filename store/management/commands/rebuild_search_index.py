@@ -0,0 +1,22 @@
+"""
+Rebuild the full-text product search index (SQLite FTS5).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from store import search
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recreate', action='store_true', help='Drop and recreate the index table and triggers first')
+
+    def handle(self, *args, **options):
+        if not search.fts_supported():
+            raise CommandError('Full-text index requires SQLite; search uses icontains on this database.')
+        if options['recreate']:
+            search.drop_index()
+            search.create_index()
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({Product.objects.count()} products).'))
@@ -0,0 +1,22 @@
+"""
+Recompute the per-seller sales rollups (SellerStats, SellerProductStats) from order items.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from store import seller_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild seller sales rollups from OrderItem (skipping cancelled orders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', action='append', help='Username to rebuild (repeatable); default all sellers')
+
+    def handle(self, *args, **options):
+        seller_ids = None
+        if options['seller']:
+            seller_ids = list(User.objects.filter(username__in=options['seller']).values_list('id', flat=True))
+            if len(seller_ids) != len(set(options['seller'])):
+                raise CommandError('Unknown seller username.')
+        count = seller_stats.rebuild(seller_ids)
+        self.stdout.write(self.style.SUCCESS(f'Seller stats rebuilt for {count} seller(s).'))
@@ -0,0 +1,25 @@
+"""
+Mine "frequently bought together" pairs from orders placed since the last run
+into RelatedProduct (see store.related). Schedule it, e.g. hourly from cron.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from store import related
+
+
+class Command(BaseCommand):
+    help = 'Update the related-products table from new orders (or rebuild it from all orders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Drop all pairs and reprocess every order')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Orders per transaction')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stats = related.refresh(rebuild=options['rebuild'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["orders"]} new orders, {stats["pairs"]} pairs written, '
+            f'{stats["filled"]} products topped up from their category in {time.perf_counter() - start:.1f}s.'
+            + (f' Orders from the last {related.SETTLE_SECONDS}s wait for the next run.' if stats['deferred'] else '')
+        ))
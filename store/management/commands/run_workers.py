@@ -0,0 +1,56 @@
+"""
+Run background tasks from the database queue (store.queue) on a pool of
+worker threads or processes until interrupted (Ctrl+C / SIGTERM finish the
+current batch, then stop). ``--drain`` runs what is due and exits, e.g. from
+cron or after a deploy.
+"""
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from store import queue
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (order emails, stock rebalancing, related products)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--processes', action='store_true', help='Run workers as processes instead of threads')
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed at a time per worker')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when no task is due')
+        parser.add_argument('--drain', action='store_true', help='Exit once no task is due')
+
+    def handle(self, *args, **options):
+        kind = 'processes' if options['processes'] else 'threads'
+        context = multiprocessing.get_context('fork') if options['processes'] else None
+        stop = context.Event() if context else threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_args: stop.set())
+        self.stdout.write(f'{options["workers"]} worker {kind} running tasks: {", ".join(sorted(queue.TASKS))}')
+
+        if context:
+            # Children must open their own database connections.
+            connections.close_all()
+            workers = [
+                context.Process(target=self._work, args=(stop, f'process-{n}', options), daemon=True)
+                for n in range(options['workers'])
+            ]
+        else:
+            workers = [
+                threading.Thread(target=self._work, args=(stop, f'thread-{n}', options))
+                for n in range(options['workers'])
+            ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def _work(self, stop, name, options):
+        counts = queue.work(
+            stop, worker=f'{queue.default_worker()}:{name}', batch_size=options['batch_size'],
+            poll=options['poll'], drain=options['drain'],
+        )
+        self.stdout.write(f'{name}: {counts["done"]} done, {counts["failed"]} failed')
@@ -0,0 +1,84 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.functional import SimpleLazyObject
+from . import profiling
+from .cart import Cart
+
+
+class CartMiddleware:
+    """Attach a lazily built, request-scoped ``request.cart`` and let the cart storage write to the response."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.cart = SimpleLazyObject(lambda: Cart(request))
+        response = self.get_response(request)
+        self.update_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        request.cart = SimpleLazyObject(lambda: Cart(request))
+        response = await self.get_response(request)
+        self.update_response(request, response)
+        return response
+
+    @staticmethod
+    def update_response(request, response):
+        storage = getattr(request, '_cart_storage', None)
+        if storage is not None:
+            storage.update_response(response)
+
+
+class HTMLGZipMiddleware(GZipMiddleware):
+    """Gzip HTML pages of at least ``GZIP_MIN_LENGTH`` bytes; other responses pass through untouched.
+
+    Static files are compressed ahead of time (see ``store.staticfiles``).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or not response.get('Content-Type', '').startswith('text/html'):
+            return response
+        if len(response.content) < getattr(settings, 'GZIP_MIN_LENGTH', 1024):
+            return response
+        return super().process_response(request, response)
+
+
+class RequestProfilingMiddleware:
+    """Count queries and time DB work and templates per request (``REQUEST_PROFILING = True``).
+
+    Adds a ``Server-Timing`` header (staff only by default) and logs slow or N+1 requests; see ``store.profiling``.
+    Put it first in MIDDLEWARE so the session, auth and cart queries are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        profiling.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token = profiling.start()
+        response = self.get_response(request)
+        profiling.finish(token, profile, request, response)
+        return response
+
+    async def __acall__(self, request):
+        profile, token = profiling.start()
+        response = await self.get_response(request)
+        profiling.finish(token, profile, request, response)
+        return response
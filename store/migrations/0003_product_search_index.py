@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# The SQL is inlined so later edits to store.search cannot change what this migration does.
+FTS_TABLE = 'store_product_fts'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='store_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_orderitem_seller_product_seller'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
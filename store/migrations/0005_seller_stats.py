@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+
+
+def populate_seller_stats(apps, schema_editor):
+    OrderItem = apps.get_model('store', 'OrderItem')
+    SellerStats = apps.get_model('store', 'SellerStats')
+    SellerProductStats = apps.get_model('store', 'SellerProductStats')
+    items = OrderItem.objects.exclude(seller=None).exclude(order__status='X')
+    revenue = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    SellerStats.objects.bulk_create([
+        SellerStats(seller_id=r['seller_id'], units=r['units'], revenue=r['revenue'], order_count=r['orders'])
+        for r in items.values('seller_id').annotate(units=Sum('quantity'), revenue=revenue, orders=Count('order_id', distinct=True)).order_by()
+    ])
+    SellerProductStats.objects.bulk_create([
+        SellerProductStats(seller_id=r['seller_id'], product_id=r['product_id'], units=r['units'], revenue=r['revenue'])
+        for r in items.values('seller_id', 'product_id').annotate(units=Sum('quantity'), revenue=revenue).order_by()
+    ])
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('store', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sales_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Seller stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_stats', to='store.product')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_sales_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Seller product stats',
+                'indexes': [models.Index(fields=['seller', '-revenue'], name='sellerproductstats_rev_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sellerproductstats',
+            constraint=models.UniqueConstraint(fields=('seller', 'product'), name='sellerproductstats_unique'),
+        ),
+        migrations.RunPython(populate_seller_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_seller_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_rows', to='store.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-score', 'id'], name='relatedproduct_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedproduct',
+            constraint=models.UniqueConstraint(fields=('product', 'related'), name='relatedproduct_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_order_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='store.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockshard',
+            constraint=models.UniqueConstraint(fields=('product', 'number'), name='stockshard_unique'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Adding Product.stock_shards (0008) rebuilt store_product on SQLite, which drops
+# the search index's sync triggers from 0003. The SQL is inlined so later edits
+# to store.search cannot change what this migration does.
+FTS_TABLE = 'store_product_fts'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='store_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+        # Rows written since the triggers were dropped are missing from the index.
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_task_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
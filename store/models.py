@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -31,6 +32,8 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     stock = models.PositiveIntegerField(default=0)
+    # > 0: stock is split across this many StockShard rows (store.inventory); ``stock`` is their total as of the last rebalance.
+    stock_shards = models.PositiveSmallIntegerField(default=0, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, default='U')
     image = models.ImageField(upload_to='products/', blank=True, null=True)
@@ -41,6 +44,14 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Partial indexes: listings only ever read active products.
+            models.Index(fields=['-created_at'], name='product_active_created_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['gender', '-created_at'], name='product_active_gender_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['category', '-created_at'], name='product_active_cat_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['seller', '-created_at'], name='product_seller_created_idx'),
+            models.Index(fields=['stock'], name='product_stock_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -56,6 +67,21 @@ class Product(models.Model):
         return self.stock == 0
 
 
+class StockShard(models.Model):
+    """One of a sharded product's stock counters; checkouts take units from a random one."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards')
+    number = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'number'], name='stockshard_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}#{self.number}: {self.count}'
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
@@ -90,6 +116,11 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
 
     def __str__(self):
         return f'Order #{self.id} - {self.email}'
@@ -97,6 +128,11 @@ class Order(models.Model):
     def get_status_display_short(self):
         return dict(self.STATUS_CHOICES).get(self.status, self.status)
 
+    @property
+    def item_count(self):
+        """Units in the order (prefetch ``items`` when listing orders)."""
+        return sum(item.quantity for item in self.items.all())
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -105,9 +141,115 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['seller', 'order'], name='orderitem_seller_order_idx'),
+        ]
+
     def __str__(self):
         return f'{self.quantity}x {self.product.name}'
 
     @property
     def subtotal(self):
         return self.quantity * self.price
+
+
+class SellerStats(models.Model):
+    """Running sales totals per seller (non-cancelled orders), kept up to date by store.seller_stats."""
+    seller = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sales_stats')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Seller stats'
+
+    def __str__(self):
+        return f'{self.seller}: {self.units} units, ${self.revenue}'
+
+
+class SellerProductStats(models.Model):
+    """Per-product breakdown of SellerStats."""
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='product_sales_stats')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='seller_stats')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Seller product stats'
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'product'], name='sellerproductstats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', '-revenue'], name='sellerproductstats_rev_idx'),
+        ]
+
+
+class RelatedProduct(models.Model):
+    """Frequently-bought-together pairs, mined from orders by store.related.
+
+    ``score`` counts the non-cancelled orders containing both products; rows with
+    score 0 are category neighbours filled in for products with few co-purchases.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_rows')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='relatedproduct_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-score', 'id'], name='relatedproduct_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} -> {self.related_id} ({self.score})'
+
+
+class JobWatermark(models.Model):
+    """How far an incremental background job has got (e.g. the last Order id it processed)."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class Task(models.Model):
+    """A unit of background work queued by store.queue and run by ``run_workers``.
+
+    Finished tasks are deleted; failed ones stay (status F) with their last error.
+    """
+    PENDING, RUNNING, FAILED = 'P', 'R', 'F'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # At most one pending task per key: enqueuing a duplicate is a no-op.
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dedupe_key'], condition=models.Q(status='P'), name='task_pending_dedupe_key'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.get_status_display()})'
@@ -0,0 +1,81 @@
+"""Order placement."""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .catalog import bump_catalog_version
+from .models import OrderItem, Product
+from . import dashboard, inventory, seller_stats
+from .queue import enqueue_on_commit
+from .tasks import checkout_tasks
+
+
+class OutOfStock(Exception):
+    """Raised when a cart line asks for more units than are left."""
+
+    def __init__(self, product, quantity):
+        super().__init__(f'{product.name}: {quantity} requested')
+        self.product = product
+        self.quantity = quantity
+
+
+def place_order(order, items):
+    """Save ``order`` with one OrderItem per cart line and take the stock, all in one transaction.
+
+    ``items`` is the list from ``cart_items()``. Stock is decremented in the
+    database with a conditional ``F('stock') - qty`` update per product, so
+    concurrent checkouts cannot oversell: if any line no longer fits,
+    ``OutOfStock`` is raised and nothing is written. Sharded products take
+    their units from one of their stock shards instead (store.inventory).
+    Emails and other follow-up work are queued for ``run_workers`` when the
+    transaction commits (store.tasks).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock rows in a consistent order so concurrent multi-line carts cannot deadlock.
+        for item in sorted(items, key=lambda i: i['product'].pk):
+            product, quantity = item['product'], item['quantity']
+            if product.stock_shards:
+                updated = inventory.take(product, quantity)
+            else:
+                updated = Product.objects.filter(pk=product.pk, is_active=True, stock__gte=quantity).update(
+                    stock=F('stock') - quantity, updated_at=now,
+                )
+            if not updated:
+                raise OutOfStock(product, quantity)
+        order.total = sum(item['subtotal'] for item in items)
+        order.save()
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item['product'],
+                seller_id=item['product'].seller_id,
+                quantity=item['quantity'],
+                price=item['price'],
+            )
+            for item in items
+        ])
+        seller_stats.apply_order(order, 1, items=order_items)
+        # Stock moved through queryset updates, which send no signals: move the dashboard
+        # counters here. Listings only show stock as "Out of stock", so cached listings, rails
+        # and facets are invalidated only on a sell-out (product pages follow updated_at).
+        stock = dict(Product.objects.filter(pk__in=[item['product'].pk for item in items]).values_list('id', 'stock'))
+        sharded = [item['product'].pk for item in items if item['product'].stock_shards]
+        # Product.stock lags the shards: write a sharded sell-out now so listings show it.
+        emptied = set(inventory.sold_out(sharded)) if sharded else set()
+        if emptied:
+            Product.objects.filter(pk__in=emptied).update(stock=0, updated_at=now)
+        sold_out = False
+        for item in items:
+            product_id = item['product'].pk
+            if not item['product'].stock_shards:
+                before, after = stock[product_id] + item['quantity'], stock[product_id]
+            elif product_id in emptied:
+                before, after = stock[product_id], 0
+            else:
+                continue
+            dashboard.stock_moved(before, after)
+            sold_out |= before != 0 and after == 0
+        if sold_out:
+            transaction.on_commit(bump_catalog_version)
+        enqueue_on_commit(*checkout_tasks(order, items))
+    return order
@@ -0,0 +1,145 @@
+"""Pagination for catalog and order listings.
+
+Offset pagination (``Paginator``) needs a ``COUNT(*)`` and an ``OFFSET`` scan per
+page. With ``CURSOR_PAGINATION = True`` listings use keyset pagination on
+``(created_at, id)`` instead: each page is one indexed range query, and pages are
+addressed by opaque ``cursor`` tokens rather than page numbers.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(created_at, pk, direction):
+    """Opaque token for the row (created_at, pk); direction is 'n' (after it) or 'p' (before it)."""
+    raw = json.dumps([created_at.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, pk, direction) or None if the token is missing or invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created, pk, direction = json.loads(raw)
+        created_at = parse_datetime(created)
+    except (ValueError, TypeError):
+        return None
+    if created_at is None or not isinstance(pk, int) or direction not in ('n', 'p'):
+        return None
+    return created_at, pk, direction
+
+
+class CursorPage:
+    """One page of a keyset-paginated queryset. No total count is known."""
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator over a queryset, newest first by (created_at, id)."""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def _query(self, token):
+        """(queryset for the page plus one lookahead row, came from next, came from previous)."""
+        cursor = decode_cursor(token)
+        qs = self.queryset
+        if cursor is None:
+            return qs.order_by('-created_at', '-id')[:self.per_page + 1], False, False
+        created_at, pk, direction = cursor
+        if direction == 'n':
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            qs = qs.order_by('-created_at', '-id')
+        else:
+            qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            qs = qs.order_by('created_at', 'id')
+        return qs[:self.per_page + 1], direction == 'n', direction == 'p'
+
+    def _page(self, rows, came_from_next, came_from_previous):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if came_from_previous:
+            rows.reverse()
+        has_next = more if not came_from_previous else True
+        has_previous = came_from_next or (came_from_previous and more)
+        if not rows:
+            return CursorPage([])
+        first, last = rows[0], rows[-1]
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(last.created_at, last.pk, 'n') if has_next else None,
+            previous_cursor=encode_cursor(first.created_at, first.pk, 'p') if has_previous else None,
+        )
+
+    def get_page(self, token):
+        qs, came_from_next, came_from_previous = self._query(token)
+        return self._page(list(qs), came_from_next, came_from_previous)
+
+    async def aget_page(self, token):
+        qs, came_from_next, came_from_previous = self._query(token)
+        return self._page([row async for row in qs], came_from_next, came_from_previous)
+
+
+def cursor_pagination_enabled():
+    return getattr(settings, 'CURSOR_PAGINATION', False)
+
+
+def paginate(request, object_list, per_page):
+    """Return the requested page of ``object_list``, by cursor or by page number.
+
+    Keyset pagination is used only for querysets; other sequences (e.g. ranked
+    search results) always use ``Paginator``.
+    """
+    if cursor_pagination_enabled() and isinstance(object_list, QuerySet):
+        return CursorPaginator(object_list, per_page).get_page(request.GET.get('cursor'))
+    return Paginator(object_list, per_page).get_page(request.GET.get('page', 1))
+
+
+async def apaginate(request, queryset, per_page):
+    """Async ``paginate`` for querysets: the count and the page rows use the async ORM."""
+    if cursor_pagination_enabled():
+        return await CursorPaginator(queryset, per_page).aget_page(request.GET.get('cursor'))
+    paginator = Paginator(queryset, per_page)
+    # Fill the cached count up front so get_page() does not run a sync COUNT.
+    paginator.__dict__['count'] = await queryset.acount()
+    page = paginator.get_page(request.GET.get('page', 1))
+    page.object_list = [obj async for obj in page.object_list]
+    return page
+
+
+def page_querystring(request):
+    """Current query string without pagination params, for building page links."""
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+    return query.urlencode()
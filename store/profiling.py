@@ -0,0 +1,199 @@
+"""Per-request SQL and template profiling (opt-in with ``REQUEST_PROFILING``).
+
+While a request is profiled, every query on every database connection goes
+through ``record_query`` (installed in the connections' ``execute_wrappers``,
+the list ``connection.execute_wrapper()`` pushes onto) and template rendering
+is timed around ``Template._render``. The active profile is a context
+variable, so queries the async views run in worker threads are counted too.
+
+Queries are grouped by fingerprint (SQL with ``IN (...)`` lists collapsed);
+the same fingerprint running ``N_PLUS_ONE_THRESHOLD`` times or more in one
+request is reported as an N+1 suspect, e.g. one item lookup per order.
+Slow requests and requests with suspects are written as JSON lines to the
+``store.profiling`` logger (a rotating file, see LOGGING in settings) and
+listed for staff on the admin dashboard's slow requests page.
+"""
+import json
+import logging
+import re
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+logger = logging.getLogger('store.profiling')
+
+_current = ContextVar('store_request_profile', default=None)
+_installed = False
+_original_render = Template._render
+
+IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with IN lists collapsed, so the same statement with other parameters matches."""
+    return WHITESPACE.sub(' ', IN_LIST.sub('(...)', sql)).strip()
+
+
+def threshold():
+    return getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+
+
+def slow_request_ms():
+    return getattr(settings, 'SLOW_REQUEST_MS', 500)
+
+
+class RequestProfile:
+    """Counters for one request: queries by fingerprint, DB and template time."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = {}  # fingerprint -> [count, seconds]
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    def add_query(self, sql, elapsed):
+        entry = self.queries.setdefault(fingerprint(sql), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        self.query_count += 1
+        self.db_time += elapsed
+
+    def n_plus_one(self):
+        """[(fingerprint, count, seconds)] for statements repeated at least ``threshold()`` times."""
+        limit = threshold()
+        return sorted(
+            ((sql, count, seconds) for sql, (count, seconds) in self.queries.items() if count >= limit),
+            key=lambda row: -row[1],
+        )
+
+    def summary(self, request, response):
+        total = time.perf_counter() - self.started
+        slowest = sorted(self.queries.items(), key=lambda item: -item[1][1])[:3]
+        return {
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'method': request.method,
+            'path': request.get_full_path()[:300],
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'queries': self.query_count,
+            'n_plus_one': [
+                {'sql': sql[:300], 'count': count, 'ms': round(seconds * 1000, 1)}
+                for sql, count, seconds in self.n_plus_one()
+            ],
+            'slowest': [
+                {'sql': sql[:300], 'count': count, 'ms': round(seconds * 1000, 1)}
+                for sql, (count, seconds) in slowest
+            ],
+        }
+
+    def server_timing(self):
+        """Value for the ``Server-Timing`` header (db and template time overlap when templates run queries)."""
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries", '
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates", '
+            f'total;dur={total:.1f}'
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def _wrap_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed_render(self, context):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context)
+    # Only the outermost template is timed; includes and parents render inside it.
+    profile._template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile._template_depth -= 1
+        if not profile._template_depth:
+            profile.template_time += time.perf_counter() - start
+
+
+def install():
+    """Hook the query wrapper into every connection and the timer into template rendering (once)."""
+    global _installed, _original_render
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_wrap_connection)
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    # Wrap whatever is installed now (the test runner swaps in its own instrumented render).
+    _original_render = Template._render
+    Template._render = _timed_render
+
+
+def start():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def finish(token, profile, request, response):
+    _current.reset(token)
+    summary = None
+    slow = (time.perf_counter() - profile.started) * 1000 >= slow_request_ms()
+    if slow or profile.n_plus_one():
+        summary = profile.summary(request, response)
+        summary['reason'] = 'slow' if slow else 'n+1'
+        logger.warning(json.dumps(summary))
+    if _send_server_timing(request):
+        response['Server-Timing'] = profile.server_timing()
+    return summary
+
+
+def _send_server_timing(request):
+    """``SERVER_TIMING_HEADER``: 'staff' (default) for staff users only, True for everyone, False for nobody."""
+    setting = getattr(settings, 'SERVER_TIMING_HEADER', 'staff')
+    if setting == 'staff':
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+    return bool(setting)
+
+
+def log_path():
+    return Path(getattr(settings, 'PROFILING_LOG', settings.BASE_DIR / 'slow_requests.log'))
+
+
+def recent_entries(limit=200):
+    """The last ``limit`` logged summaries, newest first (current log file only)."""
+    path = log_path()
+    if not path.exists():
+        return []
+    with path.open(encoding='utf-8') as log:
+        lines = deque(log, maxlen=limit)
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
@@ -0,0 +1,176 @@
+"""A small task queue kept in the database (the Task table), run by ``run_workers``.
+
+Register a handler with ``@task()`` (see store.tasks), build tasks with
+``new_task(name, payload)`` and queue them with ``enqueue()`` or, from inside a
+transaction, ``enqueue_on_commit()`` so they are only written (and run) if the
+transaction commits. The handler is called with the payload as keyword
+arguments.
+
+Workers claim due tasks in batches: with ``select_for_update(skip_locked=True)``
+where the database supports it (PostgreSQL, MySQL 8), so workers never wait on
+each other's rows; on SQLite, which runs one writer at a time, with a single
+``UPDATE ... WHERE id IN (SELECT ... LIMIT n)``. A claim holds the batch for
+``TASK_LEASE_SECONDS``; tasks of a worker that died are claimed again after
+that. A task that raises is retried after ``TASK_RETRY_DELAY`` seconds, doubled
+on each attempt, until it has run ``max_attempts`` times; then it stays in the
+table as failed. Tasks run at least once, so handlers must tolerate a repeat.
+
+A task with a ``dedupe_key`` is dropped at enqueue time if a pending task with
+the same key exists, which also batches bursts: the first enqueue fixes when
+the work runs, later ones in the meantime are absorbed by it.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name=None, max_attempts=None):
+    """Register the decorated function as the handler for tasks called ``name`` (default: its name)."""
+    def register(fn):
+        fn.task_name = name or fn.__name__
+        fn.max_attempts = max_attempts
+        TASKS[fn.task_name] = fn
+        return fn
+    return register
+
+
+def lease():
+    return timedelta(seconds=getattr(settings, 'TASK_LEASE_SECONDS', 300))
+
+
+def retry_delay(attempts):
+    """Seconds to wait before attempt ``attempts + 1``: doubling, with a little jitter, capped at an hour."""
+    delay = min(getattr(settings, 'TASK_RETRY_DELAY', 30) * 2 ** (attempts - 1), 3600)
+    return delay * random.uniform(1, 1.1)
+
+
+def new_task(name, payload=None, dedupe_key=None, delay=0):
+    """An unsaved Task for the handler registered as ``name``."""
+    if name not in TASKS:
+        raise ValueError(f'No task handler named {name!r}')
+    max_attempts = TASKS[name].max_attempts or getattr(settings, 'TASK_MAX_ATTEMPTS', 5)
+    return Task(
+        name=name, payload=payload or {}, dedupe_key=dedupe_key, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(*tasks):
+    """Insert ``tasks`` in one statement; those whose ``dedupe_key`` is already pending are skipped."""
+    Task.objects.bulk_create(tasks, ignore_conflicts=True)
+
+
+def enqueue_on_commit(*tasks):
+    """``enqueue()`` once the current transaction commits (not at all if it rolls back).
+
+    A failure to enqueue is logged rather than raised: the transaction has
+    already committed by then.
+    """
+    transaction.on_commit(lambda: enqueue(*tasks), robust=True)
+
+
+def claim(worker, limit=10):
+    """Mark up to ``limit`` due tasks as running for ``worker`` and return them."""
+    now = timezone.now()
+    token = f'{worker[:90]}:{uuid.uuid4().hex[:8]}'
+    due = (
+        Task.objects.filter(Q(status=Task.PENDING, run_at__lte=now) | Q(status=Task.RUNNING, locked_until__lt=now))
+        .order_by('run_at', 'id')
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            claimed = Task.objects.filter(pk__in=list(
+                due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit]
+            ))
+        else:
+            claimed = Task.objects.filter(pk__in=due.values('pk')[:limit])
+        if not claimed.update(
+            status=Task.RUNNING, locked_by=token, locked_until=now + lease(), attempts=F('attempts') + 1,
+        ):
+            return []
+    return list(Task.objects.filter(status=Task.RUNNING, locked_by=token).order_by('run_at', 'id'))
+
+
+def _finish(task, error):
+    """Schedule a retry of ``task`` after ``error``, or mark it failed after its last attempt."""
+    mine = Task.objects.filter(pk=task.pk, locked_by=task.locked_by)
+    fields = {'locked_by': '', 'locked_until': None, 'last_error': error[-4000:]}
+    if task.attempts >= task.max_attempts:
+        mine.update(status=Task.FAILED, **fields)
+        return
+    try:
+        with transaction.atomic():
+            mine.update(
+                status=Task.PENDING, run_at=timezone.now() + timedelta(seconds=retry_delay(task.attempts)), **fields,
+            )
+    except IntegrityError:
+        # A newer copy with the same dedupe_key is already queued and will do the work.
+        mine.delete()
+
+
+def run(task):
+    """Run one claimed task; True if it succeeded (and was deleted)."""
+    handler = TASKS.get(task.name)
+    if handler is None:
+        error = f'No task handler named {task.name!r}'
+    elif task.attempts > task.max_attempts:
+        error = 'Lease expired on the last attempt (worker stopped or task too slow)'
+    else:
+        try:
+            handler(**task.payload)
+        except Exception:
+            error = traceback.format_exc()
+        else:
+            Task.objects.filter(pk=task.pk, locked_by=task.locked_by).delete()
+            return True
+    logger.warning('Task %s #%s failed (attempt %s of %s): %s', task.name, task.pk, task.attempts,
+                   task.max_attempts, error.strip().splitlines()[-1])
+    _finish(task, error)
+    return False
+
+
+def default_worker():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(stop, worker=None, batch_size=10, poll=1.0, drain=False):
+    """Claim and run tasks until ``stop`` is set (or, with ``drain``, until none are due).
+
+    Returns {'done', 'failed'} counts.
+    """
+    worker = worker or default_worker()
+    counts = {'done': 0, 'failed': 0}
+    try:
+        while not stop.is_set():
+            try:
+                batch = claim(worker, batch_size)
+            except OperationalError:
+                # SQLite "database is locked" under heavy write load: try again shortly.
+                logger.warning('Worker %s could not claim tasks', worker, exc_info=True)
+                stop.wait(poll)
+                continue
+            if not batch:
+                if drain:
+                    break
+                stop.wait(poll)
+                continue
+            for task in batch:
+                counts['done' if run(task) else 'failed'] += 1
+    finally:
+        connection.close()
+    return counts
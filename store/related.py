@@ -0,0 +1,191 @@
+"""Related products for the product page ("frequently bought together").
+
+``refresh()`` mines OrderItem co-occurrence into RelatedProduct: each pair of
+distinct products in one non-cancelled order adds 1 to both directions' score.
+Orders are read in id order from the ``related_products`` watermark on, so
+each run only processes orders placed since the previous one (``rebuild=True``
+starts over). Ids are handed out at INSERT, not at commit, so a lower id can
+become visible after a higher one: the watermark stops at the first order
+younger than ``SETTLE_SECONDS``, and those orders wait for the next run.
+Cancelling an order afterwards does not take its pairs back out; rebuild now
+and then to drop them.
+
+Products with fewer than ``RELATED_PRODUCTS_LIMIT`` co-purchased neighbours
+also get score-0 rows for the newest active products in their category, so
+the page always reads one indexed range of RelatedProduct. Each run only tops
+up the products its orders touched and those created since the previous run;
+until then, a new product falls back to a live category query.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import permutations
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import JobWatermark, Order, OrderItem, Product, RelatedProduct
+
+WATERMARK = 'related_products'
+CANCELLED = 'X'
+# Orders with more distinct products than this are skipped: bulk orders say little about affinity.
+MAX_ORDER_PRODUCTS = 20
+# Orders (and products) younger than this may still have an earlier one committing: left for the next run.
+SETTLE_SECONDS = 60
+# Product ids per lookup query when topping up touched products.
+LOOKUP_CHUNK = 500
+
+
+def limit():
+    return getattr(settings, 'RELATED_PRODUCTS_LIMIT', 4)
+
+
+def _rows(product_id):
+    return (
+        RelatedProduct.objects.filter(product_id=product_id, related__is_active=True)
+        .select_related('related').order_by('-score', 'id')[:limit()]
+    )
+
+
+def _category_neighbours(product):
+    return Product.objects.filter(category_id=product.category_id, is_active=True).exclude(id=product.id)[:limit()]
+
+
+def related_products(product):
+    """Up to ``limit()`` products to show with ``product``, in one indexed lookup."""
+    related = [row.related for row in _rows(product.id)]
+    return related or list(_category_neighbours(product))
+
+
+async def arelated_products(product):
+    related = [row.related async for row in _rows(product.id)]
+    return related or [p async for p in _category_neighbours(product)]
+
+
+def related_versions(product_id, category_id):
+    """[(id, updated_at)] of the products ``related_products`` shows (for ETag / Last-Modified)."""
+    versions = list(
+        RelatedProduct.objects.filter(product_id=product_id, related__is_active=True)
+        .order_by('-score', 'id').values_list('related_id', 'related__updated_at')[:limit()]
+    )
+    return versions or list(
+        Product.objects.filter(category_id=category_id, is_active=True).exclude(id=product_id)
+        .values_list('id', 'updated_at')[:limit()]
+    )
+
+
+def _add_pairs(counts):
+    """Add ``{(product_id, related_id): n}`` to the stored scores (insert or increment)."""
+    qn = connection.ops.quote_name
+    table = qn(RelatedProduct._meta.db_table)
+    # Upsert with increment (SQLite 3.24+ and PostgreSQL syntax); the ORM's update_conflicts can only overwrite.
+    sql = (
+        f'INSERT INTO {table} ({qn("product_id")}, {qn("related_id")}, {qn("score")}) VALUES (%s, %s, %s) '
+        f'ON CONFLICT ({qn("product_id")}, {qn("related_id")}) DO UPDATE SET {qn("score")} = {table}.{qn("score")} + excluded.{qn("score")}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(product_id, related_id, n) for (product_id, related_id), n in counts.items()])
+    return len(counts)
+
+
+def _fill_from_categories(candidates):
+    """Score-0 category neighbours for the active products in the ``candidates`` querysets with fewer
+    than ``limit()`` rows; returns how many products."""
+    n = limit()
+    by_category = defaultdict(set)
+    for products in candidates:
+        short = products.filter(is_active=True).annotate(rows=Count('related_rows')).filter(rows__lt=n)
+        for product_id, category_id in short.values_list('id', 'category_id').iterator(chunk_size=5000):
+            by_category[category_id].add(product_id)
+    filled = 0
+    for category_id, products in by_category.items():
+        neighbours = list(
+            Product.objects.filter(category_id=category_id, is_active=True).values_list('id', flat=True)[:n + 1]
+        )
+        rows = [
+            RelatedProduct(product_id=product_id, related_id=other, score=0)
+            for product_id in products
+            for other in [other for other in neighbours if other != product_id][:n]
+        ]
+        # Existing pairs (real co-purchases) win.
+        RelatedProduct.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        filled += len(products)
+    return filled
+
+
+def _lock_watermark(pk):
+    """The watermark row, locked until the current transaction ends."""
+    if not connection.features.has_select_for_update:
+        # SQLite ignores FOR UPDATE; write first so the transaction holds the write lock before it reads.
+        JobWatermark.objects.filter(pk=pk).update(position=F('position'))
+    return JobWatermark.objects.select_for_update().get(pk=pk)
+
+
+def refresh(rebuild=False, batch_size=5000):
+    """Process orders placed since the last run; returns {'orders', 'pairs', 'filled', 'deferred'}.
+
+    ``deferred`` is True when orders younger than ``SETTLE_SECONDS`` were left
+    for a later run. Each batch of orders commits together with the watermark,
+    so an interrupted run resumes where it stopped. Each batch locks the
+    watermark row before reading it, so concurrent runs (several workers)
+    take turns and never count an order twice.
+    """
+    stats = {'orders': 0, 'pairs': 0, 'filled': 0, 'deferred': False}
+    watermark, created = JobWatermark.objects.get_or_create(name=WATERMARK)
+    cutoff = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    # The watermark is saved at the end of every run, so its updated_at is when the previous run finished.
+    full = rebuild or created
+    products_since = watermark.updated_at - timedelta(seconds=SETTLE_SECONDS)
+    if rebuild:
+        with transaction.atomic():
+            _lock_watermark(watermark.pk)
+            RelatedProduct.objects.all().delete()
+            JobWatermark.objects.filter(pk=watermark.pk).update(position=0)
+            watermark.position = 0
+    # The first order too young to process; the watermark must not pass it.
+    stop = (
+        Order.objects.filter(id__gt=watermark.position, created_at__gt=cutoff).order_by('id')
+        .values_list('id', flat=True).first()
+    )
+    stats['deferred'] = stop is not None
+    touched = set()
+    while True:
+        with transaction.atomic():
+            # A concurrent run waits here, then reads the position this batch leaves behind.
+            watermark = _lock_watermark(watermark.pk)
+            pending = OrderItem.objects.filter(order_id__gt=watermark.position)
+            if stop is not None:
+                pending = pending.filter(order_id__lt=stop)
+            order_ids = list(pending.order_by('order_id').values_list('order_id', flat=True).distinct()[:batch_size])
+            if not order_ids:
+                break
+            baskets = defaultdict(set)
+            items = (
+                OrderItem.objects.filter(order_id__gte=order_ids[0], order_id__lte=order_ids[-1])
+                .exclude(order__status=CANCELLED).values_list('order_id', 'product_id')
+            )
+            for order_id, product_id in items:
+                baskets[order_id].add(product_id)
+                touched.add(product_id)
+            counts = Counter()
+            for products in baskets.values():
+                if 1 < len(products) <= MAX_ORDER_PRODUCTS:
+                    counts.update(permutations(products, 2))
+            if counts:
+                stats['pairs'] += _add_pairs(counts)
+            # update() leaves updated_at alone: it marks the end of the last complete run.
+            JobWatermark.objects.filter(pk=watermark.pk).update(position=order_ids[-1])
+        stats['orders'] += len(order_ids)
+    if full:
+        candidates = [Product.objects.all()]
+    else:
+        touched = sorted(touched)
+        candidates = [Product.objects.filter(created_at__gt=products_since)] + [
+            Product.objects.filter(id__in=touched[i:i + LOOKUP_CHUNK]) for i in range(0, len(touched), LOOKUP_CHUNK)
+        ]
+    with transaction.atomic():
+        stats['filled'] = _fill_from_categories(candidates)
+        # Only the timestamp: a concurrent run may have moved the position on.
+        JobWatermark.objects.filter(pk=watermark.pk).update(updated_at=timezone.now())
+    return stats
@@ -0,0 +1,180 @@
+"""Full-text product search.
+
+On SQLite the catalog is indexed by an FTS5 virtual table (``store_product_fts``)
+that mirrors ``Product.name`` and ``Product.description``. Triggers created by
+migration 0003 keep it in sync with ``store_product``, so bulk inserts and
+queryset updates are indexed too. A schema change that rebuilds
+``store_product`` drops those triggers, so ``restore_triggers`` runs after
+every ``migrate`` and puts back any that are missing. Other databases fall back
+to ``icontains``.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'store_product_fts'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='store_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_supported(conn=None):
+    """True if the database can host the FTS5 index (SQLite only)."""
+    return (conn or connection).vendor == 'sqlite'
+
+
+def create_index(conn=None):
+    """Create the FTS5 table and sync triggers, then (re)build the index."""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def restore_triggers(sender, using, **kwargs):
+    """``post_migrate`` receiver: recreate missing sync triggers and rebuild the index they missed."""
+    conn = connections[using]
+    if not fts_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE],
+        )
+        if cursor.fetchone() is None:
+            # Not created yet (migrated backwards past 0003): nothing to repair.
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'store_product'",
+        )
+        if set(TRIGGERS) <= {name for name, in cursor.fetchall()}:
+            return
+    create_index(conn)
+
+
+def drop_index(conn=None):
+    """Remove the FTS5 table and its triggers."""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_index(conn=None):
+    """Rebuild the index from store_product and merge its segments."""
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN_RE.findall(q)
+    return ' '.join(f'"{t}"*' for t in tokens)
+
+
+class SearchResults:
+    """Ranked search hits as a lazy sequence, so ``Paginator`` only loads one page of products.
+
+    The queryset's filters (category, gender, price band, ``is_active``) run
+    inside the full-text query, joined to the index by product id, so every
+    match that passes them is counted and ranked; ``count()`` and each page
+    are one query on the index (bm25, name weighted, best match first).
+    ``filter()`` narrows the queryset like ``QuerySet.filter``.
+    """
+
+    def __init__(self, qs, expr):
+        self.qs = qs
+        self.expr = expr
+        self._count = None
+
+    def _matches(self):
+        """(FROM ... WHERE ... SQL, params) for the rows of ``qs`` that match the search."""
+        inner, params = self.qs.order_by().values('id').query.sql_with_params()
+        sql = f'FROM {FTS_TABLE} JOIN ({inner}) AS hits ON hits.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s'
+        return sql, [*params, self.expr]
+
+    def ranked_ids(self, offset=0, limit=None):
+        if not self.expr or limit == 0:
+            return []
+        sql, params = self._matches()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {FTS_TABLE}.rowid {sql} ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), {FTS_TABLE}.rowid '
+                f'LIMIT %s OFFSET %s',
+                [*params, -1 if limit is None else limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, *args, **kwargs):
+        return SearchResults(self.qs.filter(*args, **kwargs), self.expr)
+
+    def as_queryset(self):
+        """The hits as an (unordered) queryset, e.g. for aggregation."""
+        if not self.expr:
+            return self.qs.none()
+        return self.qs.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.expr]))
+
+    def count(self):
+        if self._count is None:
+            self._count = 0
+            if self.expr:
+                sql, params = self._matches()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) {sql}', params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            page_ids = self.ranked_ids(start, None if key.stop is None else max(0, key.stop - start))
+            by_id = {p.id: p for p in self.qs.filter(id__in=page_ids)} if page_ids else {}
+            return [by_id[pk] for pk in page_ids if pk in by_id]
+        ids = self.ranked_ids(key, 1)
+        if not ids:
+            raise IndexError(key)
+        return self.qs.get(id=ids[0])
+
+
+def search_products(qs, q):
+    """Filter a Product queryset by the search text ``q``.
+
+    With the FTS index this returns :class:`SearchResults` ordered by relevance;
+    otherwise a queryset filtered with ``icontains``.
+    """
+    if not fts_supported():
+        return qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
+    return SearchResults(qs, match_expression(q))
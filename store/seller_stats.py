@@ -0,0 +1,79 @@
+"""Incremental per-seller sales rollups (SellerStats / SellerProductStats).
+
+``apply_order(order, +1)`` when an order is placed or un-cancelled,
+``apply_order(order, -1)`` when it is cancelled or deleted. ``rebuild()``
+recomputes everything from OrderItem.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from .models import OrderItem, SellerProductStats, SellerStats
+
+CANCELLED = 'X'
+
+
+def apply_order(order, sign=1, items=None):
+    """Add (sign=1) or subtract (sign=-1) one order's items to its sellers' rollups."""
+    if items is None:
+        items = list(order.items.exclude(seller=None).values('seller_id', 'product_id', 'quantity', 'price'))
+    else:
+        items = [
+            {'seller_id': i.seller_id, 'product_id': i.product_id, 'quantity': i.quantity, 'price': i.price}
+            for i in items if i.seller_id
+        ]
+    if not items:
+        return
+    per_seller = defaultdict(lambda: [0, Decimal('0')])
+    per_product = defaultdict(lambda: [0, Decimal('0')])
+    for i in items:
+        revenue = i['quantity'] * i['price']
+        for bucket in (per_seller[i['seller_id']], per_product[(i['seller_id'], i['product_id'])]):
+            bucket[0] += i['quantity']
+            bucket[1] += revenue
+
+    with transaction.atomic():
+        SellerStats.objects.bulk_create(
+            [SellerStats(seller_id=seller_id) for seller_id in per_seller], ignore_conflicts=True,
+        )
+        SellerProductStats.objects.bulk_create(
+            [SellerProductStats(seller_id=s, product_id=p) for s, p in per_product], ignore_conflicts=True,
+        )
+        for seller_id, (units, revenue) in per_seller.items():
+            SellerStats.objects.filter(seller_id=seller_id).update(
+                units=F('units') + sign * units,
+                revenue=F('revenue') + sign * revenue,
+                order_count=F('order_count') + sign,
+            )
+        for (seller_id, product_id), (units, revenue) in per_product.items():
+            SellerProductStats.objects.filter(seller_id=seller_id, product_id=product_id).update(
+                units=F('units') + sign * units,
+                revenue=F('revenue') + sign * revenue,
+            )
+
+
+def rebuild(seller_ids=None):
+    """Recompute rollups from OrderItem (all sellers, or only ``seller_ids``). Returns sellers written."""
+    items = OrderItem.objects.exclude(seller=None).exclude(order__status=CANCELLED)
+    if seller_ids is not None:
+        items = items.filter(seller_id__in=seller_ids)
+    revenue = Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    with transaction.atomic():
+        stats = SellerStats.objects.all()
+        product_stats = SellerProductStats.objects.all()
+        if seller_ids is not None:
+            stats = stats.filter(seller_id__in=seller_ids)
+            product_stats = product_stats.filter(seller_id__in=seller_ids)
+        stats.delete()
+        product_stats.delete()
+        rows = [
+            SellerStats(seller_id=r['seller_id'], units=r['units'], revenue=r['revenue'], order_count=r['orders'])
+            for r in items.values('seller_id').annotate(units=Sum('quantity'), revenue=revenue, orders=Count('order_id', distinct=True)).order_by()
+        ]
+        SellerStats.objects.bulk_create(rows, batch_size=1000)
+        SellerProductStats.objects.bulk_create([
+            SellerProductStats(seller_id=r['seller_id'], product_id=r['product_id'], units=r['units'], revenue=r['revenue'])
+            for r in items.values('seller_id', 'product_id').annotate(units=Sum('quantity'), revenue=revenue).order_by()
+        ], batch_size=1000)
+    return len(rows)
@@ -0,0 +1,141 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .catalog import bump_catalog_version, invalidate_categories
+from .models import Category, Order, Product
+from .queue import enqueue_on_commit, new_task
+from . import dashboard, inventory, seller_stats, thumbnails
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate_categories()
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._previous_status = (
+        Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, **kwargs):
+    """Take cancelled orders out of the seller rollups, and put un-cancelled ones back."""
+    previous = getattr(instance, '_previous_status', None)
+    if created or previous is None or previous == instance.status:
+        return
+    if instance.status == seller_stats.CANCELLED:
+        seller_stats.apply_order(instance, -1)
+    elif previous == seller_stats.CANCELLED:
+        seller_stats.apply_order(instance, 1)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if instance.status != seller_stats.CANCELLED:
+        seller_stats.apply_order(instance, -1)
+
+
+# --- Dashboard counters ---
+
+@receiver(post_save, sender=Order)
+def order_counters(sender, instance, created, **kwargs):
+    if created:
+        dashboard.adjust('total_orders', 1)
+        dashboard.adjust('pending_orders', int(instance.status == 'P'))
+        return
+    previous = getattr(instance, '_previous_status', None)
+    if previous is not None:
+        dashboard.adjust('pending_orders', int(instance.status == 'P') - int(previous == 'P'))
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted_counters(sender, instance, **kwargs):
+    dashboard.adjust('total_orders', -1)
+    dashboard.adjust('pending_orders', -int(instance.status == 'P'))
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_stock(sender, instance, update_fields=None, **kwargs):
+    instance._previous_stock = None
+    if instance.pk and (update_fields is None or 'stock' in update_fields):
+        instance._previous_stock = Product.objects.filter(pk=instance.pk).values_list('stock', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def product_stock_counters(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_stock', None)
+    if created:
+        before = []
+    elif previous is not None:
+        before = dashboard.stock_counters(previous)
+    else:
+        return
+    if instance.stock_shards and previous is not None and previous != instance.stock:
+        # A new stock level for a sharded product is the new total of its shards.
+        inventory.set_total(instance, instance.stock)
+    after = dashboard.stock_counters(instance.stock)
+    for name in before:
+        dashboard.adjust(name, -1)
+    for name in after:
+        dashboard.adjust(name, 1)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_counters(sender, instance, **kwargs):
+    for name in dashboard.stock_counters(instance.stock):
+        dashboard.adjust(name, -1)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_staff(sender, instance, update_fields=None, **kwargs):
+    instance._previous_is_staff = None
+    if instance.pk and (update_fields is None or 'is_staff' in update_fields):
+        instance._previous_is_staff = User.objects.filter(pk=instance.pk).values_list('is_staff', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_counters(sender, instance, created, **kwargs):
+    if created:
+        dashboard.adjust('total_users', int(not instance.is_staff))
+        return
+    previous = getattr(instance, '_previous_is_staff', None)
+    if previous is not None:
+        dashboard.adjust('total_users', int(previous) - int(instance.is_staff))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_counters(sender, instance, **kwargs):
+    dashboard.adjust('total_users', -int(not instance.is_staff))
+
+
+# --- Image variants ---
+
+_image_fields = {apps.get_model(label): field for label, field in thumbnails.IMAGE_FIELDS}
+
+
+def remember_upload(sender, instance, **kwargs):
+    """Note whether the image field holds a new, not yet stored upload (ProductForm, admin)."""
+    file = getattr(instance, _image_fields[sender])
+    instance._image_uploaded = bool(file) and not file._committed
+
+
+def generate_thumbnails(sender, instance, **kwargs):
+    if getattr(instance, '_image_uploaded', False):
+        name = getattr(instance, _image_fields[sender]).name
+        enqueue_on_commit(new_task('generate_thumbnails', {'name': name}, dedupe_key=f'generate_thumbnails:{name}'))
+
+
+for _model in _image_fields:
+    pre_save.connect(remember_upload, sender=_model)
+    post_save.connect(generate_thumbnails, sender=_model)
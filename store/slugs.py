@@ -0,0 +1,120 @@
+"""Unique product slugs.
+
+A slug is ``base`` or ``base-N``. The taken ``base`` / ``base-N`` slugs are read
+with one query per base (one per batch of bases for bulk inserts) and the
+next free one is picked in Python, highest suffix + 1. The unique index on
+``Product.slug`` stays the source of truth: when a concurrent insert takes the
+same slug first, the write raises IntegrityError and is retried with a fresh
+read.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from .models import Product
+
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+RETRIES = 5
+# Bases per lookup query when allocating for a batch (keeps the OR list short).
+LOOKUP_CHUNK = 100
+
+
+def base_slug(text):
+    return slugify(text)[:SLUG_MAX_LENGTH - 10].strip('-') or 'item'
+
+
+def taken_suffixes(bases):
+    """{base: set of taken suffixes} for ``bases``; 0 stands for the bare base."""
+    taken = {base: set() for base in bases}
+    bases = list(taken)
+    for i in range(0, len(bases), LOOKUP_CHUNK):
+        chunk = bases[i:i + LOOKUP_CHUNK]
+        condition = Q()
+        for base in chunk:
+            # An index range rather than LIKE 'base-%', which SQLite cannot run on the index ('.' sorts right after '-').
+            condition |= Q(slug=base) | Q(slug__gte=f'{base}-', slug__lt=f'{base}.')
+        for slug in Product.objects.filter(condition).order_by().values_list('slug', flat=True):
+            _add_taken(taken, slug)
+    return taken
+
+
+def _add_taken(taken, slug):
+    # "ring-12" is both the bare slug of base "ring-12" and suffix 12 of base "ring".
+    if slug in taken:
+        taken[slug].add(0)
+    match = re.fullmatch(r'(.+)-(\d+)', slug)
+    if match and match.group(1) in taken:
+        taken[match.group(1)].add(int(match.group(2)))
+
+
+class SlugAllocator:
+    """Hands out unique slugs for many texts, reading each base's taken slugs once."""
+
+    def __init__(self):
+        self.taken = {}
+        self.issued = set()
+
+    def prefetch(self, texts):
+        missing = {base_slug(text) for text in texts} - self.taken.keys()
+        if missing:
+            self.taken.update(taken_suffixes(missing))
+
+    def allocate(self, text):
+        base = base_slug(text)
+        if base not in self.taken:
+            self.taken.update(taken_suffixes([base]))
+        used = self.taken[base]
+        n = max(used) + 1 if used else 0
+        # Another base's "<base>-N" in this batch can be this base's bare slug, or the reverse.
+        while (f'{base}-{n}' if n else base) in self.issued:
+            n += 1
+        used.add(n)
+        slug = f'{base}-{n}' if n else base
+        self.issued.add(slug)
+        return slug
+
+    def forget(self, texts):
+        """Drop cached bases so the next allocation re-reads them (after losing a race)."""
+        for text in texts:
+            self.taken.pop(base_slug(text), None)
+
+
+def save_with_unique_slug(product, text=None):
+    """Give ``product`` a free slug derived from ``text`` (default: its name) and save it."""
+    text = text or product.name
+    for attempt in range(RETRIES):
+        product.slug = SlugAllocator().allocate(text)
+        try:
+            with transaction.atomic():
+                product.save()
+            return product
+        except IntegrityError:
+            if attempt == RETRIES - 1 or not Product.objects.filter(slug=product.slug).exists():
+                raise
+            product.pk = None  # the failed INSERT must not turn into an UPDATE on retry
+
+
+def bulk_create_with_unique_slugs(products, batch_size=500):
+    """bulk_create ``products`` with slugs allocated from their names; returns the created objects."""
+    allocator = SlugAllocator()
+    created = []
+    for i in range(0, len(products), batch_size):
+        batch = products[i:i + batch_size]
+        names = [p.name for p in batch]
+        for attempt in range(RETRIES):
+            allocator.prefetch(names)
+            for product in batch:
+                product.slug = allocator.allocate(product.name)
+            try:
+                with transaction.atomic():
+                    created += Product.objects.bulk_create(batch)
+                break
+            except IntegrityError:
+                if attempt == RETRIES - 1:
+                    raise
+                allocator.forget(names)
+                for product in batch:
+                    product.pk = None
+    return created
@@ -0,0 +1,111 @@
+"""Static files: content-hashed names plus pre-compressed ``.gz`` siblings.
+
+``collectstatic`` writes ``css/style.3f2a9c1d.css`` (cacheable forever, the
+name changes with the content) and, for text assets, ``css/style.3f2a9c1d.css.gz``
+next to it. ``serve`` hands out the ``.gz`` file to clients that accept gzip;
+nginx does the same with ``gzip_static on``. Until ``collectstatic`` has run,
+templates get the plain names, as with the default storage.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.map', '.html', '.ico')
+MIN_COMPRESS_SIZE = 256
+# Hashed names never change content, so they can be cached for a year.
+HASHED_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class GzipManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes ``<hashed name>.gz`` for compressible files."""
+
+    # A name missing from the manifest falls back to hashing the collected file (or the plain name).
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (no collectstatic yet): serve the unhashed name rather than fail the page.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in hashed_names:
+            if self.compress(hashed_name):
+                yield hashed_name, hashed_name + '.gz', True
+
+    def compress(self, name):
+        """Write ``name.gz`` if ``name`` is compressible and gzip makes it smaller; returns True if written."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return False
+        with self.open(name) as fh:
+            content = fh.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return False
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            return False
+        if self.exists(name + '.gz'):
+            self.delete(name + '.gz')
+        with open(self.path(name + '.gz'), 'wb') as fh:
+            fh.write(compressed)
+        return True
+
+
+def serve(request, path):
+    """Serve a collected static file from STATIC_ROOT, preferring its ``.gz`` sibling.
+
+    Meant for deployments without a front-end server; behind nginx use
+    ``gzip_static on`` and a long ``expires`` on the static location instead.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or not staticfiles_storage.exists(path):
+        raise Http404(path)
+    full_path = staticfiles_storage.path(path)
+    mtime = os.path.getmtime(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+        return HttpResponseNotModified()
+    content_type, encoding = mimetypes.guess_type(full_path)
+    serve_path = full_path
+    use_gzip = (
+        encoding is None
+        and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        and os.path.exists(full_path + '.gz')
+    )
+    if use_gzip:
+        serve_path = full_path + '.gz'
+    response = FileResponse(
+        open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream',
+        filename=os.path.basename(full_path),
+    )
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    if path.endswith(COMPRESSIBLE_EXTENSIONS):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response.headers['Last-Modified'] = http_date(mtime)
+    hashed = _is_hashed(path)
+    max_age = HASHED_MAX_AGE if hashed else getattr(settings, 'STATIC_MAX_AGE', 60 * 60)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}' + (', immutable' if hashed else '')
+    return response
+
+
+def _is_hashed(path):
+    """True for names like ``style.3f2a9c1d4e5b.css`` (the manifest's 12-hex-digit hash)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    _base, _dot, suffix = stem.rpartition('.')
+    return len(suffix) == 12 and all(c in '0123456789abcdef' for c in suffix)
@@ -0,0 +1,93 @@
+"""Background tasks (store.queue), run by ``run_workers``.
+
+``place_order`` queues ``checkout_tasks()`` when its transaction commits: the
+buyer's confirmation, one email per seller in the order, a rebalance of any
+sharded stock it took, and the related-products refresh. Handlers look the
+order up again and do nothing if it has been deleted since. Image uploads
+queue ``generate_thumbnails`` (store.signals).
+"""
+from collections import defaultdict
+
+from django.core.mail import send_mail, send_mass_mail
+from django.template.loader import render_to_string
+
+from . import inventory, related, thumbnails
+from .models import Order
+from .queue import enqueue, new_task, task
+
+# Seconds a refresh waits for more orders to land, so one run covers a burst of checkouts.
+RELATED_REFRESH_DELAY = 300
+# Seconds before rebalancing a product a checkout took sharded stock from.
+STOCK_REBALANCE_DELAY = 5
+
+
+def _order(order_id):
+    return (
+        Order.objects.filter(pk=order_id)
+        .prefetch_related('items__product', 'items__seller').first()
+    )
+
+
+@task()
+def send_order_confirmation(order_id):
+    order = _order(order_id)
+    if order is None:
+        return
+    body = render_to_string('store/emails/order_confirmation.txt', {'order': order})
+    send_mail(f'Your order #{order.id}', body, None, [order.email])
+
+
+@task()
+def notify_sellers(order_id):
+    order = _order(order_id)
+    if order is None:
+        return
+    by_seller = defaultdict(list)
+    for item in order.items.all():
+        if item.seller is not None and item.seller.email:
+            by_seller[item.seller].append(item)
+    send_mass_mail([
+        (f'New sale: order #{order.id}',
+         render_to_string('store/emails/seller_sale.txt', {'order': order, 'seller': seller, 'items': items}),
+         None, [seller.email])
+        for seller, items in by_seller.items()
+    ])
+
+
+@task()
+def rebalance_stock(product_ids):
+    inventory.rebalance(product_ids)
+
+
+@task(max_attempts=3)
+def refresh_related_products():
+    if related.refresh()['deferred']:
+        # Orders too recent to process yet: come back for them.
+        enqueue(_related_refresh())
+
+
+@task()
+def generate_thumbnails(name):
+    thumbnails.generate(name, force=True)
+
+
+def _related_refresh():
+    return new_task('refresh_related_products', dedupe_key='refresh_related_products', delay=RELATED_REFRESH_DELAY)
+
+
+def checkout_tasks(order, items):
+    """Tasks to queue once ``order`` (placed from cart ``items``) has committed."""
+    tasks = [
+        new_task('send_order_confirmation', {'order_id': order.pk}),
+        _related_refresh(),
+    ]
+    if any(item['product'].seller_id for item in items):
+        tasks.append(new_task('notify_sellers', {'order_id': order.pk}))
+    for item in items:
+        if item['product'].stock_shards:
+            product_id = item['product'].pk
+            tasks.append(new_task(
+                'rebalance_stock', {'product_ids': [product_id]},
+                dedupe_key=f'rebalance_stock:{product_id}', delay=STOCK_REBALANCE_DELAY,
+            ))
+    return tasks
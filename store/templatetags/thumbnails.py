@@ -0,0 +1,36 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from store import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', width=None, **attrs):
+    """``<picture>`` with WebP and JPEG ``srcset`` for an image field, e.g.
+
+        {% responsive_image product.image sizes="(min-width: 768px) 25vw, 50vw" alt=product.name class="card-img-top" %}
+
+    ``width`` caps the variants offered (e.g. 160 for small avatars). Falls back
+    to a plain ``<img>`` of the original until its variants have been generated.
+    """
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join(' ', '{}="{}"', sorted(attrs.items()))
+    if not image or not thumbnails.has_variants(image.name):
+        return format_html('<img src="{}" {}>', image.url if image else '', extra)
+
+    widths = [w for w in thumbnails.widths() if width is None or w <= int(width)] or thumbnails.widths()[:1]
+
+    def srcset(fmt):
+        return ', '.join(
+            f'{default_storage.url(thumbnails.variant_name(image.name, w, fmt))} {w}w' for w in widths
+        )
+
+    fallback = default_storage.url(thumbnails.variant_name(image.name, widths[len(widths) // 2], 'jpeg'))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        srcset('webp'), sizes, fallback, srcset('jpeg'), sizes, extra,
+    )
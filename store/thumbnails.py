@@ -0,0 +1,150 @@
+"""Fixed-width WebP and JPEG variants of uploaded images.
+
+Variants live next to the media tree under ``THUMBNAIL_DIR``:
+``products/ring.png`` becomes ``thumbs/products/ring.png-320.webp`` and
+``thumbs/products/ring.png-320.jpg`` for each width in ``THUMBNAIL_WIDTHS``.
+Names are derived from the original's full name (extension included, so
+``ring.png`` and ``ring.jpg`` never share variants), so templates can build a
+``srcset`` without a database lookup (see ``store.templatetags.thumbnails``).
+
+Variants are written by a background task queued when an image is uploaded
+(signals in ``store.signals``, task in ``store.tasks``) and in bulk, on a
+process pool, by ``manage.py generate_thumbnails``. Until they exist, pages
+show the original; a missing image is re-checked on disk at most every
+``THUMBNAIL_MISS_TIMEOUT`` seconds per process.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+FORMATS = [
+    # (format key, file extension, Pillow format, mime type)
+    ('webp', 'webp', 'WEBP', 'image/webp'),
+    ('jpeg', 'jpg', 'JPEG', 'image/jpeg'),
+]
+
+# (model label, image field) for every image the site shows.
+IMAGE_FIELDS = [
+    ('store.Product', 'image'),
+    ('store.ProductImage', 'image'),
+    ('store.Category', 'image'),
+    ('accounts.UserProfile', 'avatar'),
+]
+
+_known = set()
+# name -> time.monotonic() until which the variants are taken to be missing.
+_missing = {}
+
+
+def widths():
+    return sorted(getattr(settings, 'THUMBNAIL_WIDTHS', [160, 320, 640, 960]))
+
+
+def variant_name(name, width, fmt):
+    """Storage name of the ``width``-pixel ``fmt`` variant of the image stored as ``name``."""
+    ext = dict((key, ext) for key, ext, _p, _m in FORMATS)[fmt]
+    return f"{getattr(settings, 'THUMBNAIL_DIR', 'thumbs')}/{name}-{width}.{ext}"
+
+
+def has_variants(name, storage=default_storage):
+    """True once the variants of ``name`` exist (checked on the smallest JPEG).
+
+    Positives are memoized; negatives for ``THUMBNAIL_MISS_TIMEOUT`` seconds, so
+    a page does not stat the storage on every render while a variant is missing.
+    """
+    if name in _known:
+        return True
+    now = time.monotonic()
+    if _missing.get(name, 0) > now:
+        return False
+    if storage.exists(variant_name(name, widths()[0], 'jpeg')):
+        _known.add(name)
+        _missing.pop(name, None)
+        return True
+    _missing[name] = now + getattr(settings, 'THUMBNAIL_MISS_TIMEOUT', 60)
+    return False
+
+
+def generate(name, force=False, storage=default_storage):
+    """Write every variant of ``name``; returns the number of files written.
+
+    Images are never upscaled: a width larger than the original reuses the
+    original size. Unreadable files are skipped.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if not force and has_variants(name, storage):
+        return 0
+    try:
+        with storage.open(name, 'rb') as fh:
+            original = ImageOps.exif_transpose(Image.open(fh))
+            original.load()
+    except (OSError, UnidentifiedImageError):
+        return 0
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+    written = 0
+    for width in widths():
+        resized = original
+        if original.width > width:
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+        for fmt, _ext, pil_format, _mime in FORMATS:
+            image = resized
+            if pil_format == 'JPEG' and image.mode == 'RGBA':
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            buffer = BytesIO()
+            image.save(buffer, pil_format, quality=quality, optimize=pil_format == 'JPEG')
+            target = variant_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    _known.add(name)
+    _missing.pop(name, None)
+    return written
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _generate_forced(name):
+    return generate(name, force=True)
+
+
+def _generate_missing(name):
+    return generate(name)
+
+
+def generate_many(names, force=False, workers=None):
+    """Generate variants for many images on a process pool; yields files written per image."""
+    fn = _generate_forced if force else _generate_missing
+    if workers == 1:
+        for name in names:
+            yield fn(name)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(fn, names, chunksize=8)
+
+
+def image_names():
+    """Names of every stored image referenced by IMAGE_FIELDS."""
+    from django.apps import apps
+    names = []
+    for label, field in IMAGE_FIELDS:
+        model = apps.get_model(label)
+        names.extend(
+            model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values_list(field, flat=True).order_by('pk').iterator()
+        )
+    return names
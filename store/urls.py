@@ -1,14 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'store'
 
+# Catalog read views: async versions for ASGI deployments, sync ones under WSGI.
+catalog = async_views if getattr(settings, 'ASYNC_CATALOG_VIEWS', False) else views
+
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('shop/', views.shop, name='shop'),
-    path('shop/men/', views.shop, {'gender': 'M'}, name='shop_men'),
-    path('shop/women/', views.shop, {'gender': 'F'}, name='shop_women'),
-    path('product/<slug:slug>/', views.product_detail, name='product_detail'),
+    path('', catalog.home, name='home'),
+    path('shop/', catalog.shop, name='shop'),
+    path('shop/men/', catalog.shop, {'gender': 'M'}, name='shop_men'),
+    path('shop/women/', catalog.shop, {'gender': 'F'}, name='shop_women'),
+    path('product/<slug:slug>/', catalog.product_detail, name='product_detail'),
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:product_id>/', views.cart_add_view, name='cart_add'),
     path('cart/remove/<int:product_id>/', views.cart_remove_view, name='cart_remove'),
@@ -16,10 +20,14 @@ urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
     path('order/<int:order_id>/confirmation/', views.order_confirmation, name='order_confirmation'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/orders/export/', views.orders_export, name='orders_export'),
+    path('admin-dashboard/slow-requests/', views.slow_requests, name='slow_requests'),
     # Seller: my listings, add/edit/delete, my sales
     path('my-listings/', views.my_listings, name='my_listings'),
     path('my-listings/add/', views.add_listing, name='add_listing'),
+    path('my-listings/upload/', views.upload_listings, name='upload_listings'),
     path('my-listings/<int:pk>/edit/', views.edit_listing, name='edit_listing'),
     path('my-listings/<int:pk>/delete/', views.delete_listing, name='delete_listing'),
     path('my-sales/', views.my_sales, name='my_sales'),
+    path('my-sales/export/', views.my_sales_export, name='my_sales_export'),
 ]
@@ -1,62 +1,102 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
 from django.urls import reverse
-from django.utils.text import slugify
-from .models import Product, Category, Order, OrderItem
-from .cart import cart_items, cart_total, cart_add, cart_remove, cart_update, cart_clear
-from .forms import CheckoutForm, ProductForm
-
-
+from django.db import transaction
+from django.views.decorators.http import condition
+from .models import Product, Order, OrderItem, SellerStats, SellerProductStats
+from . import dashboard, profiling
+from .catalog import bump_catalog_version, get_categories, get_home_rails
+from .conditional import catalog_etag, product_etag, product_last_modified
+from .exports import export_response
+from .facets import PRICE_BAND_KEYS, facet_counts, filter_price_band, grouped_counts
+from .cart import get_request_cart, cart_add, cart_remove, cart_update, cart_clear
+from .forms import CheckoutForm, ListingUploadForm, ProductForm
+from .inventory import live_stock
+from .orders import OutOfStock, place_order
+from .pagination import paginate, page_querystring
+from .related import related_products
+from .search import search_products
+from .slugs import bulk_create_with_unique_slugs, save_with_unique_slug
+
+
+@condition(etag_func=catalog_etag)
 def home(request):
-    """Home page with featured products split by Men / Women."""
-    categories = Category.objects.all()[:6]
-    featured_men = Product.objects.filter(is_active=True, gender='M')[:8]
-    featured_women = Product.objects.filter(is_active=True, gender='F')[:8]
-    featured_unisex = Product.objects.filter(is_active=True, gender='U')[:4]
+    """Home page with featured products split by Men / Women (cached per catalog version)."""
     return render(request, 'store/home.html', {
-        'categories': categories,
-        'featured_men': featured_men,
-        'featured_women': featured_women,
-        'featured_unisex': featured_unisex,
+        'categories': get_categories()[:6],
+        **get_home_rails(),
     })
 
 
-def shop(request, gender=None):
-    """Shop listing with category and gender filters. gender can come from URL (Men/Women) or GET."""
-    qs = Product.objects.filter(is_active=True)
+def shop_listing(request, gender, categories):
+    """Selections and querysets for the shop page (no query runs here).
+
+    Returns (selected, hits, qs): ``hits`` are the search hits that facets are
+    counted over, ``qs`` narrows them by category, gender and price band.
+    """
     category_slug = request.GET.get('category')
     gender = gender or request.GET.get('gender')
+    if gender not in ('M', 'F', 'U'):
+        gender = None
+    price_band = request.GET.get('price')
+    if price_band not in PRICE_BAND_KEYS:
+        price_band = None
     q = request.GET.get('q', '').strip()
+    category = next((c for c in categories if c.slug == category_slug), None)
 
+    hits = Product.objects.filter(is_active=True).select_related('seller')
+    if q:
+        hits = search_products(hits, q)
+    qs = hits
     if category_slug:
         qs = qs.filter(category__slug=category_slug)
-    if gender and gender in ('M', 'F', 'U'):
+    if gender:
         qs = qs.filter(gender=gender)
-    if q:
-        qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
-
-    paginator = Paginator(qs, 12)
-    page = request.GET.get('page', 1)
-    products = paginator.get_page(page)
-    categories = Category.objects.all()
-
-    return render(request, 'store/shop.html', {
+    if price_band:
+        qs = filter_price_band(qs, price_band)
+    selected = {
+        'category': category, 'category_slug': category_slug, 'gender': gender, 'price_band': price_band, 'q': q,
+    }
+    return selected, hits, qs
+
+
+def shop_context(request, selected, categories, products, rows):
+    facets = facet_counts(
+        rows, category_id=selected['category'].id if selected['category'] else None,
+        gender=selected['gender'], band=selected['price_band'],
+    )
+    return {
         'products': products,
         'categories': categories,
-        'selected_category': category_slug,
-        'selected_gender': gender,
-        'search_q': q,
-    })
+        'facets': facets,
+        'selected_category': selected['category_slug'],
+        'selected_gender': selected['gender'],
+        'selected_price': selected['price_band'],
+        'search_q': selected['q'],
+        'page_query': page_querystring(request),
+    }
 
 
+@condition(etag_func=catalog_etag)
+def shop(request, gender=None):
+    """Shop listing with category, gender and price filters. gender can come from URL (Men/Women) or GET."""
+    categories = get_categories()
+    selected, hits, qs = shop_listing(request, gender, categories)
+    products = paginate(request, qs, 12)
+    rows = grouped_counts(hits, selected['q'])
+    return render(request, 'store/shop.html', shop_context(request, selected, categories, products, rows))
+
+
+@condition(etag_func=product_etag, last_modified_func=product_last_modified)
 def product_detail(request, slug):
     """Product detail page."""
     product = get_object_or_404(Product, slug=slug, is_active=True)
-    related = Product.objects.filter(category=product.category, is_active=True).exclude(id=product.id)[:4]
+    live_stock([product])
+    related = related_products(product)
     return render(request, 'store/product_detail.html', {
         'product': product,
         'related': related,
@@ -66,9 +106,7 @@ def product_detail(request, slug):
 @login_required
 def cart_view(request):
     """Cart page. Login required to buy (add to cart, checkout)."""
-    items = cart_items(request)
-    total = cart_total(request)
-    return render(request, 'store/cart.html', {'cart_items': items, 'cart_total': total})
+    return render(request, 'store/cart.html', {'cart': get_request_cart(request)})
 
 
 @login_required
@@ -115,8 +153,8 @@ def cart_update_view(request, product_id):
 @login_required
 def checkout(request):
     """Checkout: show form and place order."""
-    items = cart_items(request)
-    if not items:
+    cart = get_request_cart(request)
+    if not cart.items:
         messages.warning(request, 'Your cart is empty.')
         return redirect('store:shop')
 
@@ -126,18 +164,11 @@ def checkout(request):
             order = form.save(commit=False)
             order.user = request.user
             order.email = order.email or request.user.email or request.user.username
-            order.total = cart_total(request)
-            order.save()
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    seller=item['product'].seller,
-                    quantity=item['quantity'],
-                    price=item['price'],
-                )
-                item['product'].stock -= item['quantity']
-                item['product'].save(update_fields=['stock'])
+            try:
+                place_order(order, cart.items)
+            except OutOfStock as exc:
+                messages.error(request, f'Sorry, "{exc.product.name}" no longer has {exc.quantity} in stock. Please review your cart.')
+                return redirect('store:cart')
             cart_clear(request)
             messages.success(request, 'Order placed successfully!')
             return redirect('store:order_confirmation', order_id=order.id)
@@ -153,8 +184,7 @@ def checkout(request):
             initial.update({'phone': p.phone or '', 'address': p.default_address or '', 'city': p.default_city or '', 'postal_code': p.default_postal_code or '', 'country': p.default_country or ''})
         form = CheckoutForm(initial=initial)
 
-    total = cart_total(request)
-    return render(request, 'store/checkout.html', {'form': form, 'cart_items': items, 'cart_total': total})
+    return render(request, 'store/checkout.html', {'form': form, 'cart': cart})
 
 
 # --- Seller: my listings, add/edit/delete, my sales ---
@@ -162,8 +192,8 @@ def checkout(request):
 @login_required
 def my_listings(request):
     """List products the current user is selling."""
-    products = Product.objects.filter(seller=request.user).order_by('-created_at')
-    return render(request, 'store/seller/my_listings.html', {'products': products})
+    products = paginate(request, Product.objects.filter(seller=request.user).order_by('-created_at'), 24)
+    return render(request, 'store/seller/my_listings.html', {'products': products, 'page_query': page_querystring(request)})
 
 
 @login_required
@@ -174,14 +204,7 @@ def add_listing(request):
         if form.is_valid():
             product = form.save(commit=False)
             product.seller = request.user
-            base_slug = slugify(product.name)[:180] or 'item'
-            slug = base_slug
-            n = 0
-            while Product.objects.filter(slug=slug).exists():
-                n += 1
-                slug = f'{base_slug}-{n}'
-            product.slug = slug
-            product.save()
+            save_with_unique_slug(product)
             messages.success(request, 'Listing created.')
             return redirect('store:my_listings')
     else:
@@ -189,6 +212,30 @@ def add_listing(request):
     return render(request, 'store/seller/add_listing.html', {'form': form})
 
 
+@login_required
+def upload_listings(request):
+    """Create many listings at once from a CSV file (all rows or none)."""
+    if request.method == 'POST':
+        form = ListingUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            products = form.cleaned_data['products']
+            for product in products:
+                product.seller = request.user
+            with transaction.atomic():
+                created = bulk_create_with_unique_slugs(products)
+            # bulk_create sends no post_save: refresh what the product signals would have.
+            bump_catalog_version()
+            dashboard.invalidate('products')
+            messages.success(request, f'{len(created)} listing{"" if len(created) == 1 else "s"} created.')
+            return redirect('store:my_listings')
+    else:
+        form = ListingUploadForm()
+    return render(request, 'store/seller/upload_listings.html', {
+        'form': form,
+        'max_rows': getattr(settings, 'LISTING_UPLOAD_MAX_ROWS', 1000),
+    })
+
+
 @login_required
 def edit_listing(request, pk):
     """Edit a listing. Only owner or staff."""
@@ -223,9 +270,23 @@ def delete_listing(request, pk):
 
 @login_required
 def my_sales(request):
-    """List order items the current user sold (seller side)."""
-    items = OrderItem.objects.filter(seller=request.user).select_related('order', 'product').order_by('-order__created_at')
-    return render(request, 'store/seller/my_sales.html', {'sold_items': items})
+    """Seller side: sales rollup, best-selling products and a paginated list of recent sold items."""
+    stats = SellerStats.objects.filter(seller=request.user).first() or SellerStats(seller=request.user)
+    top_products = SellerProductStats.objects.filter(seller=request.user).select_related('product').order_by('-revenue')[:10]
+    items = OrderItem.objects.filter(seller=request.user).select_related('order', 'product').order_by('-order__created_at', '-id')
+    sold_items = Paginator(items, 25).get_page(request.GET.get('page', 1))
+    return render(request, 'store/seller/my_sales.html', {
+        'stats': stats,
+        'top_products': top_products,
+        'sold_items': sold_items,
+        'page_query': page_querystring(request),
+    })
+
+
+@login_required
+def my_sales_export(request):
+    """Every line the seller has sold, streamed as CSV (?format=jsonl for JSON lines)."""
+    return export_response('sales', request.GET.get('format'), 'sales', seller=request.user)
 
 
 def order_confirmation(request, order_id):
@@ -249,22 +310,28 @@ def order_confirmation(request, order_id):
 
 @staff_member_required
 def admin_dashboard(request):
-    """Admin dashboard with stats."""
-    from django.contrib.auth import get_user_model
-
-    User = get_user_model()
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='P').count()
-    total_users = User.objects.filter(is_staff=False).count()
-    low_stock_products = Product.objects.filter(stock__lte=5, stock__gt=0).count()
-    out_of_stock = Product.objects.filter(stock=0).count()
+    """Admin dashboard with stats (cached counters; ?refresh=1 recomputes them)."""
+    stats = dashboard.get_stats(refresh=request.GET.get('refresh') == '1')
     recent_orders = Order.objects.all()[:10]
 
     return render(request, 'store/admin/dashboard.html', {
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'total_users': total_users,
-        'low_stock_products': low_stock_products,
-        'out_of_stock': out_of_stock,
+        **stats,
         'recent_orders': recent_orders,
     })
+
+
+@staff_member_required
+def orders_export(request):
+    """All order lines, streamed as CSV (?format=jsonl for JSON lines)."""
+    return export_response('all-orders', request.GET.get('format'), 'all-orders')
+
+
+@staff_member_required
+def slow_requests(request):
+    """Recent slow / N+1 request summaries from the profiling log (REQUEST_PROFILING)."""
+    return render(request, 'store/admin/slow_requests.html', {
+        'entries': profiling.recent_entries(),
+        'enabled': getattr(settings, 'REQUEST_PROFILING', False),
+        'slow_ms': profiling.slow_request_ms(),
+        'threshold': profiling.threshold(),
+    })